@@ -1,6 +1,8 @@
 # Makes the directory a package
 from analysis.resume_parser import parse_resume
-from analysis.job_analyzer import analyze_resume_match, generate_interview_tips
+from analysis.job_analyzer import analyze_resume_match, analyze_resume_match_batch, generate_interview_tips
 from analysis.industry_analyzer import analyze_industry_fit
 from analysis.report_generator import generate_comprehensive_report, generate_cover_letter
-from analysis.trend_analyzer import store_analysis_history, generate_trend_charts
+from analysis.trend_analyzer import store_analysis_history, store_analysis_history_batch, generate_trend_charts
+from analysis.pipeline import run_full_analysis, run_documents, run_async, run_batch_analysis, submit_document_batch, collect_document_batch
+from analysis.batch import score_many
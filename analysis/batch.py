@@ -0,0 +1,26 @@
+import pandas as pd
+from analysis.job_analyzer import analyze_resume_match_batch
+
+# Analysis fields copied into the scoring table, one column each
+SCORE_COLUMNS = ["match_score", "industry_fit", "strengths", "improvement_areas", "keyword_analysis"]
+
+async def score_many(client, resumes, job_description):
+    """
+    Scores a Series of parsed resumes against one job description.
+    Resumes are packed several per request and the requests run concurrently through
+    analyze_resume_match_batch; the job description is sent once per request.
+    Returns a DataFrame with one row per candidate, indexed like the input Series,
+    including the skills assessment ratings as skill_* columns.
+    """
+    analyses = await analyze_resume_match_batch(client, [(resume, job_description) for resume in resumes])
+
+    rows = []
+    for analysis in analyses:
+        analysis = analysis or {}
+        row = {column: analysis.get(column) for column in SCORE_COLUMNS}
+        for skill, rating in (analysis.get("skills_assessment") or {}).items():
+            row["skill_" + skill.replace(" ", "_").lower()] = rating
+        row["analysis"] = analysis or None
+        rows.append(row)
+
+    return pd.DataFrame(rows, index=resumes.index)
@@ -1,9 +1,138 @@
-import json
+import asyncio
+import orjson
 from utils.error_tracker import error_tracker
-from utils.api_client import call_anthropic_api_with_timeout
-from utils.json_parser import extract_json_from_string
+from utils.semantic_cache import semantic_cache
+from utils.api_client import acall_anthropic_api_with_timeout
+from analysis.prompt_context import CANDIDATE_SYSTEM_PROMPT, build_candidate_context
+from utils.json_parser import JsonObjectScanner, build_validator, parse_json_from_string, to_prompt_json
 
-def analyze_resume_match(client, resume_data, job_description):
+# Batch analysis limits: estimated prompt tokens and number of pairs per request
+BATCH_TOKEN_BUDGET = 8000
+BATCH_MAX_PAIRS = 4
+BATCH_MAX_CONCURRENT_REQUESTS = 4
+
+# Required analysis fields with the default used when a field is missing or has the wrong type
+_ANALYSIS_SCHEMA = {
+    "match_score": (50, None),
+    "strengths": (["Data missing"], list),
+    "improvement_areas": (["Data missing"], list),
+    "skills_assessment": ({
+        "Technical Skills": 50,
+        "Experience": 50,
+        "Education": 50,
+        "Resume Quality": 50
+    }, dict),
+    "recommendations": (["Data missing"], list),
+    "keyword_analysis": (["Data missing"], list),
+    "industry_fit": ("Unknown", None),
+    "potential_job_titles": (["Data missing"], list),
+    "experience_gap_analysis": (["Data missing"], list)
+}
+_validate_analysis = build_validator(_ANALYSIS_SCHEMA, "_validate_analysis")
+
+# Fallback structure, serialised once; parsing the JSON yields a fresh copy per call
+_FALLBACK_ANALYSIS = {
+    "match_score": 50, 
+    "strengths": ["Data extraction failed - please try again"],
+    "improvement_areas": ["Data extraction failed - please try again"],
+    "skills_assessment": {
+        "Technical Skills": 50,
+        "Experience": 50,
+        "Education": 50,
+        "Resume Quality": 50
+    },
+    "recommendations": ["Please try again or contact support."],
+    "keyword_analysis": ["Analysis unavailable"],
+    "industry_fit": "Unknown",
+    "potential_job_titles": ["Unable to determine"],
+    "experience_gap_analysis": ["Analysis unavailable"],
+    "analysis_error": "JSON parsing failed"
+}
+_FALLBACK_ANALYSIS_JSON = orjson.dumps(_FALLBACK_ANALYSIS).decode()
+
+# Static task prompts, built once at import; the variable inputs go in the shared context block
+_MATCH_SYSTEM_PROMPT = "You are a professional job application consultant providing detailed, honest but constructive feedback to help job seekers improve their applications."
+_MATCH_ANALYSIS_FIELDS = """1. An overall "match_score" from 0 to 100, representing their fit for the position.
+2. Three to five key "strengths" that make them a good fit for this specific role.
+3. Three to five main "improvement_areas" where they could enhance their candidacy.
+4. A "skills_assessment" object with ratings (0-100) for these specific categories:
+   - "Technical Skills" (relevance to the role)
+   - "Experience" (years and quality related to the role)
+   - "Education" (relevance and level)
+   - "Resume Quality" (clarity, formatting, and presentation)
+5. "recommendations" - practical, specific suggestions to improve their resume and application for this role.
+6. "keyword_analysis" - identify key terms from the job description missing from their resume.
+7. "industry_fit" - assessment of how well the candidate matches the industry requirements for this role.
+8. "potential_job_titles" - alternate job titles that this resume would be well-suited for.
+9. "experience_gap_analysis" - identify specific experience gaps between the resume and job requirements.
+"""
+_MATCH_PROMPT = """You are an expert job application consultant. Based on the job description and resume data above, 
+analyse how well the candidate matches the job requirements and provide constructive feedback.
+
+Perform a thorough analysis of the match between this candidate and the job description, including:
+""" + _MATCH_ANALYSIS_FIELDS + """
+Structure your response as a single, valid JSON object containing these keys.
+Be constructive, honest but encouraging, highlighting both positives and areas for improvement.
+"""
+
+_BATCH_MATCH_PROMPT_INTRO = """You are an expert job application consultant. Below are several numbered pairs, each made of a job description
+and a candidate's resume data. For every pair, analyse how well the candidate matches that job description and provide constructive feedback.
+
+"""
+_BATCH_SHARED_JOB_PROMPT_INTRO = """You are an expert job application consultant. Below are several numbered pairs, each made of the job description
+above and a candidate's resume data. For every pair, analyse how well the candidate matches that job description and provide constructive feedback.
+
+"""
+_BATCH_MATCH_PROMPT_INSTRUCTIONS = """For every pair, perform a thorough analysis of the match, including:
+""" + _MATCH_ANALYSIS_FIELDS + """
+Respond with a single, valid JSON array containing one object per pair. Each object must contain an "index" key
+holding the pair number, plus the keys listed above. Be constructive, honest but encouraging.
+"""
+
+_TIPS_PROMPT = """You are a supportive career coach providing practical, personalized interview advice. Based on this candidate's resume and job description analysis above, 
+provide 5 strategic interview preparation tips tailored specifically to them.
+
+Provide 5 specific, actionable interview tips that will help this candidate:
+1. Emphasise their relevant strengths for this position
+2. Address potential concerns about improvement areas
+3. Prepare for likely questions based on the gap between their profile and job requirements
+4. Highlight their unique value proposition for this role
+5. Showcase their enthusiasm and fit for the company/role
+
+Format each tip with a clear heading and explanation. Be specific, practical and constructive.
+Tailor these tips precisely to this candidate and this job - avoid generic advice.
+"""
+
+def build_resume_match_request(job_description, resume_json):
+    """
+    Builds the match analysis request without sending it.
+    Returns the prompt and generation settings accepted by the API call helpers.
+    """
+    return {
+        "context": build_candidate_context(job_description, resume_json),
+        "prompt": _MATCH_PROMPT,
+        "max_tokens": 2500,
+        "temperature": 0.1,
+        "system": _MATCH_SYSTEM_PROMPT
+    }
+
+def parse_resume_match_response(response_text):
+    """
+    Extracts and validates a match analysis from the model's reply.
+    Shared by the interactive call and the batch pipeline.
+    """
+    # Extract JSON with structured fallbacks
+    analysis_data = parse_json_from_string(response_text, _FALLBACK_ANALYSIS_JSON)
+    
+    # Basic validation
+    if not isinstance(analysis_data, dict):
+        error_tracker.add_error("json_error", f"Analysis returned {type(analysis_data).__name__} instead of a dictionary.", True)
+        return orjson.loads(_FALLBACK_ANALYSIS_JSON)
+        
+    return _validate_analysis(analysis_data)
+
+@semantic_cache(task="resume_match")
+async def analyze_resume_match(client, resume_data, job_description, resume_json=None):
     """
     Analyses how well a resume matches with a job description.
     Returns a match analysis with scores and recommendations.
@@ -16,55 +145,17 @@ def analyze_resume_match(client, resume_data, job_description):
         error_tracker.add_error("parse_error", "Job description is too short for meaningful analysis.", False)
         job_description += "\n\nThis is a professional position requiring technical skills and relevant experience."
 
-    # Convert resume data to a JSON string for the prompt
-    try:
-        resume_json_string = json.dumps(resume_data, indent=2)
-    except Exception as e:
-        error_tracker.add_error("json_error", "Error converting resume data to JSON", True, str(e))
-        return None
-
-    prompt = f"""
-    You are an expert job application consultant. Based on the job description below and the provided resume data, 
-    analyse how well the candidate matches the job requirements and provide constructive feedback.
-
-    Job Description:
-    ---
-    {job_description}
-    ---
-
-    Resume Data (JSON):
-    ---
-    {resume_json_string}
-    ---
-
-    Perform a thorough analysis of the match between this candidate and the job description, including:
-    1. An overall "match_score" from 0 to 100, representing their fit for the position.
-    2. Three to five key "strengths" that make them a good fit for this specific role.
-    3. Three to five main "improvement_areas" where they could enhance their candidacy.
-    4. A "skills_assessment" object with ratings (0-100) for these specific categories:
-       - "Technical Skills" (relevance to the role)
-       - "Experience" (years and quality related to the role)
-       - "Education" (relevance and level)
-       - "Resume Quality" (clarity, formatting, and presentation)
-    5. "recommendations" - practical, specific suggestions to improve their resume and application for this role.
-    6. "keyword_analysis" - identify key terms from the job description missing from their resume.
-    7. "industry_fit" - assessment of how well the candidate matches the industry requirements for this role.
-    8. "potential_job_titles" - alternate job titles that this resume would be well-suited for.
-    9. "experience_gap_analysis" - identify specific experience gaps between the resume and job requirements.
-
-    Structure your response as a single, valid JSON object containing these keys.
-    Be constructive, honest but encouraging, highlighting both positives and areas for improvement.
-    """
+    # Convert resume data to a JSON string for the prompt, unless the orchestrator already did
+    resume_json = resume_json or to_prompt_json(resume_data)
 
     # Use enhanced API call with timeout
-    success, response_text = call_anthropic_api_with_timeout(
+    success, response_text = await acall_anthropic_api_with_timeout(
         client=client,
-        prompt=prompt,
-        max_tokens=2500,
-        temperature=0.1,
-        system="You are a professional job application consultant providing detailed, honest but constructive feedback to help job seekers improve their applications.",
+        **build_resume_match_request(job_description, resume_json),
         timeout=60,  # 60 second timeout
-        retries=1    # 1 retry attempt
+        retries=1,   # 1 retry attempt
+        stream=True,
+        on_text=JsonObjectScanner().feed  # Stop reading as soon as the JSON object is complete
     )
 
     if not success:
@@ -85,66 +176,118 @@ def analyze_resume_match(client, resume_data, job_description):
             "analysis_error": f"API Error: {response_text}"
         }
 
-    # Prepare fallback structure
-    fallback_analysis = {
-        "match_score": 50, 
-        "strengths": ["Data extraction failed - please try again"],
-        "improvement_areas": ["Data extraction failed - please try again"],
-        "skills_assessment": {
-            "Technical Skills": 50,
-            "Experience": 50,
-            "Education": 50,
-            "Resume Quality": 50
-        },
-        "recommendations": ["Please try again or contact support."],
-        "keyword_analysis": ["Analysis unavailable"],
-        "industry_fit": "Unknown",
-        "potential_job_titles": ["Unable to determine"],
-        "experience_gap_analysis": ["Analysis unavailable"],
-        "analysis_error": "JSON parsing failed"
+    return parse_resume_match_response(response_text)
+
+def _estimate_tokens(text):
+    """Rough token estimate (about four characters per token) used to size batches."""
+    return len(text) // 4 + 1
+
+def _chunk_pairs(prepared):
+    """Groups prepared (index, job_description, resume_json) items into requests within the token budget."""
+    chunks, current, current_tokens = [], [], 0
+    for item in prepared:
+        item_tokens = _estimate_tokens(item[1]) + _estimate_tokens(item[2])
+        if current and (current_tokens + item_tokens > BATCH_TOKEN_BUDGET or len(current) >= BATCH_MAX_PAIRS):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += item_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def _analyze_pair_chunk(client, semaphore, chunk):
+    """Sends one batched request for a chunk of pairs and returns the analyses keyed by pair index."""
+    # When every pair targets the same job, send its description once as the cached context
+    job_descriptions = {job_description for _, job_description, _ in chunk}
+    shared_job = job_descriptions.pop() if len(job_descriptions) == 1 else None
+    context = None if shared_job is None else f"Job Description:\n---\n{shared_job}\n---\n"
+
+    prompt_parts = [_BATCH_MATCH_PROMPT_INTRO if shared_job is None else _BATCH_SHARED_JOB_PROMPT_INTRO]
+    for index, job_description, resume_json in chunk:
+        if shared_job is None:
+            prompt_parts.append(f"Pair {index}:\nJob Description:\n---\n{job_description}\n---\n\n")
+        else:
+            prompt_parts.append(f"Pair {index}:\n")
+        prompt_parts.append(f"Resume Data (JSON):\n---\n{resume_json}\n---\n\n")
+    prompt_parts.append(_BATCH_MATCH_PROMPT_INSTRUCTIONS)
+
+    async with semaphore:
+        success, response_text = await acall_anthropic_api_with_timeout(
+            client=client,
+            prompt="".join(prompt_parts),
+            max_tokens=min(8000, 2000 * len(chunk)),
+            temperature=0.1,
+            system=_MATCH_SYSTEM_PROMPT,
+            context=context,
+            timeout=90,
+            retries=1
+        )
+
+    if not success:
+        error_tracker.add_error("api_error", f"Batched resume analysis failed: {response_text}", False)
+        return {}
+
+    results = parse_json_from_string(response_text)
+    if not isinstance(results, list):
+        return {}
+
+    expected = {index for index, _, _ in chunk}
+    analyses = {}
+    for result in results:
+        if isinstance(result, dict) and result.get("index") in expected:
+            analyses[result.pop("index")] = _validate_analysis(result)
+    return analyses
+
+async def analyze_resume_match_batch(client, pairs):
+    """
+    Analyses many (resume_data, job_description) pairs with several pairs per API request.
+    Returns a list of analyses in the same order as the pairs; pairs missing from a batched
+    response are retried individually through analyze_resume_match.
+    """
+    results = [None] * len(pairs)
+    prepared = []
+    for index, (resume_data, job_description) in enumerate(pairs):
+        if not resume_data or not job_description:
+            continue
+        prepared.append((index, job_description, to_prompt_json(resume_data)))
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENT_REQUESTS)
+    chunk_results = await asyncio.gather(
+        *(_analyze_pair_chunk(client, semaphore, chunk) for chunk in _chunk_pairs(prepared))
+    )
+    for analyses in chunk_results:
+        for index, analysis in analyses.items():
+            results[index] = analysis
+
+    # Fall back to individual requests for any pair the batched responses did not cover
+    missing = [index for index, _, _ in prepared if results[index] is None]
+    if missing:
+        async def retry(index):
+            async with semaphore:
+                return await analyze_resume_match(client, pairs[index][0], pairs[index][1])
+
+        retried = await asyncio.gather(*(retry(index) for index in missing))
+        for index, analysis in zip(missing, retried):
+            results[index] = analysis
+
+    return results
+
+def build_interview_tips_request(job_description, resume_json, analysis_json):
+    """
+    Builds the interview tips request without sending it.
+    Returns the prompt and generation settings accepted by the API call helpers.
+    """
+    return {
+        "context": build_candidate_context(job_description, resume_json, analysis_json),
+        "prompt": _TIPS_PROMPT,
+        "max_tokens": 1500,
+        "temperature": 0.2,
+        "system": CANDIDATE_SYSTEM_PROMPT
     }
-    
-    # Extract JSON with structured fallbacks
-    json_string = extract_json_from_string(response_text, json.dumps(fallback_analysis))
-    
-    try:
-        analysis_data = json.loads(json_string)
-        
-        # Basic validation
-        if not isinstance(analysis_data, dict):
-            error_tracker.add_error("json_error", f"Analysis returned {type(analysis_data).__name__} instead of a dictionary.", True)
-            return fallback_analysis
-            
-        # Ensure all required fields exist
-        required_fields = [
-            "match_score", "strengths", "improvement_areas", 
-            "skills_assessment", "recommendations", "keyword_analysis",
-            "industry_fit", "potential_job_titles", "experience_gap_analysis"
-        ]
-        
-        for field in required_fields:
-            if field not in analysis_data:
-                if field in ["strengths", "improvement_areas", "recommendations", "keyword_analysis", "potential_job_titles", "experience_gap_analysis"]:
-                    analysis_data[field] = ["Data missing"]
-                elif field == "skills_assessment":
-                    analysis_data[field] = {
-                        "Technical Skills": 50,
-                        "Experience": 50,
-                        "Education": 50,
-                        "Resume Quality": 50
-                    }
-                elif field == "match_score":
-                    analysis_data[field] = 50
-                elif field == "industry_fit":
-                    analysis_data[field] = "Unknown"
-        
-        return analysis_data
-        
-    except json.JSONDecodeError as json_e:
-        error_tracker.add_error("json_error", f"Failed to decode analysis JSON: {json_e}", True)
-        return fallback_analysis
 
-def generate_interview_tips(client, resume_data, job_description, analysis):
+@semantic_cache(task="interview_tips")
+async def generate_interview_tips(client, resume_data, job_description, analysis, resume_json=None, analysis_json=None):
     """
     Generates personalised interview tips based on resume and job description.
     """
@@ -156,51 +299,14 @@ def generate_interview_tips(client, resume_data, job_description, analysis):
     strengths = analysis.get('strengths', [])
     match_score = analysis.get('match_score', 50)
     
-    # Convert data to JSON for the prompt
-    try:
-        resume_json = json.dumps(resume_data, indent=2)
-        analysis_json = json.dumps(analysis, indent=2)
-    except Exception as e:
-        error_tracker.add_error("json_error", f"Error preparing data for interview tips: {e}", False)
-        return ["Error generating interview tips."]
+    # Convert data to JSON for the prompt, unless the orchestrator already did
+    resume_json = resume_json or to_prompt_json(resume_data)
+    analysis_json = analysis_json or to_prompt_json(analysis)
     
-    prompt = f"""
-    You are an expert career coach. Based on this candidate's resume and job description analysis, 
-    provide 5 strategic interview preparation tips tailored specifically to them.
-
-    Job Description:
-    ---
-    {job_description}
-    ---
-
-    Resume Data:
-    ---
-    {resume_json}
-    ---
-    
-    Resume Analysis:
-    ---
-    {analysis_json}
-    ---
-
-    Provide 5 specific, actionable interview tips that will help this candidate:
-    1. Emphasise their relevant strengths for this position
-    2. Address potential concerns about improvement areas
-    3. Prepare for likely questions based on the gap between their profile and job requirements
-    4. Highlight their unique value proposition for this role
-    5. Showcase their enthusiasm and fit for the company/role
-
-    Format each tip with a clear heading and explanation. Be specific, practical and constructive.
-    Tailor these tips precisely to this candidate and this job - avoid generic advice.
-    """
-
     # Use enhanced API call with timeout
-    success, response_text = call_anthropic_api_with_timeout(
+    success, response_text = await acall_anthropic_api_with_timeout(
         client=client,
-        prompt=prompt,
-        max_tokens=1500,
-        temperature=0.2,
-        system="You are a supportive career coach providing practical, personalized interview advice.",
+        **build_interview_tips_request(job_description, resume_json, analysis_json),
         timeout=30,
         retries=1
     )
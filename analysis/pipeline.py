@@ -0,0 +1,193 @@
+import asyncio
+import anthropic
+from analysis.job_analyzer import (
+    analyze_resume_match, generate_interview_tips,
+    build_resume_match_request, parse_resume_match_response, build_interview_tips_request
+)
+from analysis.industry_analyzer import analyze_industry_fit, build_industry_fit_request, parse_industry_fit_response
+from analysis.report_generator import (
+    generate_tailored_resume, generate_cover_letter,
+    build_tailored_resume_request, build_cover_letter_request
+)
+from utils.api_client import submit_message_batch, collect_message_batch, wait_for_message_batch
+from utils.json_parser import to_prompt_json
+
+# Upper bound on simultaneous requests, kept within Anthropic tier concurrency limits
+MAX_CONCURRENT_REQUESTS = 4
+
+async def _limited(semaphore, coro):
+    """Awaits a coroutine while holding a slot of the shared semaphore."""
+    async with semaphore:
+        return await coro
+
+async def _named(name, coro):
+    """Awaits a coroutine and tags its result with the section name it belongs to."""
+    return name, await coro
+
+async def run_full_analysis(client, resume_data, job_description, on_section=None):
+    """
+    Runs the match analysis and then the four downstream generations concurrently.
+    The downstream calls only depend on the match analysis, so they run side by side
+    and the total latency is that of the slowest call rather than their sum.
+    If given, on_section(name, data) is called as soon as each section is ready, in
+    completion order, so the UI can show the fastest results without waiting for the
+    slowest; sections still running are cancelled if the callback raises.
+    """
+    # Serialise each input once and share it with every analyzer that embeds it
+    resume_json = to_prompt_json(resume_data)
+    analysis = await analyze_resume_match(client, resume_data, job_description, resume_json=resume_json)
+    analysis_json = to_prompt_json(analysis)
+    results = {"analysis": analysis}
+    if on_section is not None:
+        on_section("analysis", analysis)
+
+    shared = {"resume_json": resume_json, "analysis_json": analysis_json}
+    results.update(await _run_sections((
+        ("industry_analysis", analyze_industry_fit(client, resume_data, job_description, analysis, **shared)),
+        ("interview_tips", generate_interview_tips(client, resume_data, job_description, analysis, **shared)),
+        ("tailored_resume", generate_tailored_resume(client, resume_data, job_description, analysis, **shared)),
+        ("cover_letter", generate_cover_letter(client, resume_data, job_description, analysis, **shared))
+    ), on_section))
+    return results
+
+async def run_documents(client, resume_data, job_description, analysis, on_section=None, include_tips=True):
+    """
+    Generates the cover letter, tailored resume and (unless include_tips is False) interview
+    tips concurrently for an existing match analysis, reporting each through on_section(name, data)
+    in completion order like run_full_analysis.
+    """
+    shared = {"resume_json": to_prompt_json(resume_data), "analysis_json": to_prompt_json(analysis)}
+    sections = [
+        ("cover_letter", generate_cover_letter(client, resume_data, job_description, analysis, **shared)),
+        ("tailored_resume", generate_tailored_resume(client, resume_data, job_description, analysis, **shared))
+    ]
+    if include_tips:
+        sections.append(("interview_tips", generate_interview_tips(client, resume_data, job_description, analysis, **shared)))
+    return await _run_sections(sections, on_section)
+
+async def _run_sections(sections, on_section):
+    """
+    Runs (name, coroutine) pairs concurrently within the request limit and returns their
+    results by name, calling on_section for each as it completes.
+    """
+    results = {}
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    tasks = [asyncio.create_task(_named(name, _limited(semaphore, coro))) for name, coro in sections]
+    try:
+        for next_section in asyncio.as_completed(tasks):
+            name, data = await next_section
+            results[name] = data
+            if on_section is not None:
+                on_section(name, data)
+    finally:
+        # Stop paying for sections nobody will see, e.g. when Streamlit stops the script mid-run
+        for task in tasks:
+            task.cancel()
+
+    return results
+
+def run_async(client, task, *args, **kwargs):
+    """
+    Runs an async analysis task to completion from Streamlit's synchronous script thread.
+    An AsyncAnthropic client is opened for the duration of the run, since its connection
+    pool is bound to the event loop created by asyncio.run.
+    """
+    async def runner():
+        async with anthropic.AsyncAnthropic(api_key=client.api_key) as async_client:
+            return await task(async_client, *args, **kwargs)
+
+    return asyncio.run(runner())
+
+# Downstream requests sent in the second batch phase: result key, request builder and failure value
+_BATCH_DOWNSTREAM = (
+    ("industry_analysis", build_industry_fit_request, None),
+    ("interview_tips", build_interview_tips_request, ["Unable to generate interview tips. Please try again later."]),
+    ("tailored_resume", build_tailored_resume_request, "Unable to generate tailored resume. Please try again later."),
+    ("cover_letter", build_cover_letter_request, "Unable to generate cover letter. Please try again later.")
+)
+
+def _run_batch(client, requests):
+    """Submits one Message Batch and waits for its results; an empty dict means it failed."""
+    batch_id = submit_message_batch(client, requests)
+    if batch_id is None:
+        return {}
+    return collect_message_batch(client, batch_id)
+
+def run_batch_analysis(client, candidates, job_description):
+    """
+    Runs the full analysis for many resumes through the Message Batches API, for
+    non-interactive pipelines where cost matters more than latency.
+    The downstream requests embed the match analysis, so this takes two batches: one with
+    every match analysis, then one with the four downstream requests for every candidate.
+    Takes a synchronous client and returns one run_full_analysis-shaped dict per candidate,
+    or None for a candidate whose match analysis failed.
+    """
+    resume_jsons = [to_prompt_json(resume_data) for resume_data in candidates]
+
+    # Phase one: every candidate's match analysis in a single batch
+    match_results = _run_batch(client, {
+        f"c{index}-match": build_resume_match_request(job_description, resume_json)
+        for index, resume_json in enumerate(resume_jsons)
+    })
+
+    results = []
+    downstream_requests = {}
+    for index, resume_json in enumerate(resume_jsons):
+        success, response_text = match_results.get(f"c{index}-match", (False, "Missing from batch results"))
+        if not success:
+            results.append(None)
+            continue
+        analysis = parse_resume_match_response(response_text)
+        results.append({"analysis": analysis})
+        analysis_json = to_prompt_json(analysis)
+        for key, build_request, _ in _BATCH_DOWNSTREAM:
+            downstream_requests[f"c{index}-{key}"] = build_request(job_description, resume_json, analysis_json)
+
+    # Phase two: the four downstream requests of every analysed candidate in a single batch
+    downstream_results = _run_batch(client, downstream_requests) if downstream_requests else {}
+    for index, result in enumerate(results):
+        if result is None:
+            continue
+        for key, _, failure_value in _BATCH_DOWNSTREAM:
+            success, response_text = downstream_results.get(f"c{index}-{key}", (False, None))
+            if not success:
+                result[key] = failure_value
+            elif key == "industry_analysis":
+                result[key] = parse_industry_fit_response(response_text)
+            else:
+                result[key] = response_text
+
+    return results
+
+# Documents offered as one discounted batch from the Quick Actions, with their failure values
+_DOCUMENT_BATCH = {
+    "interview_tips": (build_interview_tips_request, ["Unable to generate interview tips. Please try again later."]),
+    "tailored_resume": (build_tailored_resume_request, "Unable to generate tailored resume. Please try again later."),
+    "cover_letter": (build_cover_letter_request, "Unable to generate cover letter. Please try again later.")
+}
+
+def submit_document_batch(client, resume_data, job_description, analysis):
+    """
+    Submits the interview tips, tailored resume and cover letter as one Message Batch.
+    Returns the batch id, which the caller keeps (e.g. in session state) to collect the
+    documents later, or None if the batch could not be created.
+    """
+    resume_json, analysis_json = to_prompt_json(resume_data), to_prompt_json(analysis)
+    return submit_message_batch(client, {
+        name: build_request(job_description, resume_json, analysis_json)
+        for name, (build_request, _) in _DOCUMENT_BATCH.items()
+    })
+
+def collect_document_batch(client, batch_id, max_wait):
+    """
+    Waits up to max_wait seconds for a document batch. Returns None while it is still
+    processing, otherwise a dict of document name to generated text (or failure message).
+    """
+    if not wait_for_message_batch(client, batch_id, max_wait):
+        return None
+    results = collect_message_batch(client, batch_id, max_wait=0)
+    documents = {}
+    for name, (_, failure_value) in _DOCUMENT_BATCH.items():
+        success, response_text = results.get(name, (False, None))
+        documents[name] = response_text if success else failure_value
+    return documents
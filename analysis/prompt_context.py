@@ -0,0 +1,36 @@
+# Shared context segments. Every analysis prompt opens with the same job description,
+# resume and analysis block so that Anthropic prompt caching can reuse it across calls;
+# the segments must stay byte-identical between analyzers for the cached prefix to match.
+# The cached prefix starts at the system prompt, so the analyzers that share the block also
+# share one system prompt; each task's role goes in its instructions after the block.
+CANDIDATE_SYSTEM_PROMPT = "You are a career consultant helping a job seeker apply for the role described below. Follow the task instructions that come after the candidate's details."
+
+_CONTEXT_JOB = """Job Description:
+---
+"""
+_CONTEXT_RESUME = """
+---
+
+Resume Data (JSON):
+---
+"""
+_CONTEXT_ANALYSIS = """
+---
+
+Resume Analysis:
+---
+"""
+_CONTEXT_END = """
+---
+"""
+
+def build_candidate_context(job_description, resume_json, analysis_json=None):
+    """
+    Joins the candidate inputs into the cacheable block sent ahead of each task's instructions.
+    The match analysis has no prior analysis, so analysis_json is optional.
+    """
+    parts = [_CONTEXT_JOB, job_description, _CONTEXT_RESUME, resume_json]
+    if analysis_json is not None:
+        parts += [_CONTEXT_ANALYSIS, analysis_json]
+    parts.append(_CONTEXT_END)
+    return "".join(parts)
@@ -1,11 +1,75 @@
-from datetime import datetime
-import json
-from utils.error_tracker import error_tracker
-from utils.api_client import call_anthropic_api_with_timeout
+from datetime import date
+from functools import lru_cache
+from utils.api_client import acall_anthropic_api_with_timeout
+from analysis.prompt_context import CANDIDATE_SYSTEM_PROMPT, build_candidate_context
+from utils.json_parser import to_prompt_json
 
-def generate_tailored_resume(client, resume_data, job_description, analysis):
+# Static task prompts, built once at import; the variable inputs go in the shared context block
+_TAILORED_PROMPT = """You are a professional resume writer specializing in creating tailored, ATS-optimized resumes. Based on this candidate's resume and the job description analysis above, 
+create a tailored version of their resume that highlights relevant qualifications and 
+addresses the gaps identified in the analysis.
+
+Create a thoroughly tailored version of this resume that:
+
+1. Maintains the candidate's accurate work history, education, and skills
+2. Reorganizes and rephrases content to emphasize experiences relevant to this specific job
+3. Incorporates the missing keywords from the job description naturally
+4. Enhances sections that align with the identified strengths
+5. Addresses the improvement areas and experience gaps where possible
+6. Uses industry-specific terminology that's relevant to the role
+7. Follows best practices for ATS optimization
+8. Keeps a professional, clean format
+9. Uses bullet points effectively to highlight achievements and responsibilities
+10. Quantifies accomplishments where possible
+
+Address the specific job requirements while maintaining accuracy about the candidate's background.
+Format the resume in a clean, modern style with clear section headings. 
+Use British English spelling and grammar conventions.
+The result should be a complete, ready-to-use resume in Markdown format.
+"""
+
+_COVER_PROMPT = """You are a professional career consultant specialising in cover letter writing. Based on this candidate's resume and the job description analysis above, 
+create a professional cover letter that highlights their relevant qualifications and fit for the role.
+
+Write a complete, professional cover letter that:
+1. Includes a proper salutation (use "Dear Hiring Manager" if no specific recipient is known)
+2. Has an engaging introduction that mentions the specific role they're applying for
+3. Highlights 2-3 of the candidate's key strengths and qualifications that match the job requirements
+4. Uses specific examples from their experience to demonstrate these qualifications
+5. Addresses any potential gaps or concerns tactfully (if relevant)
+6. Incorporates relevant keywords from the job description naturally
+7. Expresses enthusiasm for the role and organisation
+8. Includes a strong closing paragraph with a call to action
+9. Uses a professional sign-off
+
+The cover letter should be 3-4 paragraphs, professional in tone but conversational, and tailored specifically to this candidate and position.
+Use British English spelling and grammar conventions.
+"""
+
+def _streaming(write_fn):
+    """API call options that stream the response to write_fn, or none when it is not given."""
+    if write_fn is None:
+        return {}
+    # on_text stops the stream when it returns True, so write_fn's return value is ignored
+    return {"stream": True, "on_text": lambda text: write_fn(text) and False}
+
+def build_tailored_resume_request(job_description, resume_json, analysis_json):
+    """
+    Builds the tailored resume request without sending it.
+    Returns the prompt and generation settings accepted by the API call helpers.
+    """
+    return {
+        "context": build_candidate_context(job_description, resume_json, analysis_json),
+        "prompt": _TAILORED_PROMPT,
+        "max_tokens": 3000,
+        "temperature": 0.3,
+        "system": CANDIDATE_SYSTEM_PROMPT
+    }
+
+async def generate_tailored_resume(client, resume_data, job_description, analysis, resume_json=None, analysis_json=None, write_fn=None):
     """
     Generates a tailored version of the resume optimized for the specific job description.
+    If write_fn is given, the response is streamed and each text chunk is passed to it as it arrives.
     """
     if not resume_data or not job_description or not analysis:
         return "Unable to generate tailored resume due to missing data."
@@ -15,61 +79,17 @@ def generate_tailored_resume(client, resume_data, job_description, analysis):
     strengths = analysis.get('strengths', [])
     keywords = analysis.get('keyword_analysis', [])
     
-    # Convert data to JSON for the prompt
-    try:
-        resume_json = json.dumps(resume_data, indent=2)
-        analysis_json = json.dumps(analysis, indent=2)
-    except Exception as e:
-        error_tracker.add_error("json_error", "Error preparing data for tailored resume", False, str(e))
-        return "Error generating tailored resume."
-    
-    prompt = f"""
-    You are an expert resume writer. Based on this candidate's resume and the job description analysis, 
-    create a tailored version of their resume that highlights relevant qualifications and 
-    addresses the gaps identified in the analysis.
-
-    Job Description:
-    ---
-    {job_description}
-    ---
-
-    Original Resume Data (JSON):
-    ---
-    {resume_json}
-    ---
-    
-    Resume Analysis:
-    ---
-    {analysis_json}
-    ---
-
-    Create a thoroughly tailored version of this resume that:
-
-    1. Maintains the candidate's accurate work history, education, and skills
-    2. Reorganizes and rephrases content to emphasize experiences relevant to this specific job
-    3. Incorporates the missing keywords from the job description naturally
-    4. Enhances sections that align with the identified strengths
-    5. Addresses the improvement areas and experience gaps where possible
-    6. Uses industry-specific terminology that's relevant to the role
-    7. Follows best practices for ATS optimization
-    8. Keeps a professional, clean format
-    9. Uses bullet points effectively to highlight achievements and responsibilities
-    10. Quantifies accomplishments where possible
-
-    Format the resume in a clean, modern style with clear section headings. 
-    Use British English spelling and grammar conventions.
-    The result should be a complete, ready-to-use resume in Markdown format.
-    """
-
+    # Convert data to JSON for the prompt, unless the orchestrator already did
+    resume_json = resume_json or to_prompt_json(resume_data)
+    analysis_json = analysis_json or to_prompt_json(analysis)
+    
     # Use enhanced API call with timeout
-    success, response_text = call_anthropic_api_with_timeout(
+    success, response_text = await acall_anthropic_api_with_timeout(
         client=client,
-        prompt=prompt,
-        max_tokens=3000,
-        temperature=0.3,
-        system="You are a professional resume writer specializing in creating tailored, ATS-optimized resumes. Create a tailored resume that addresses the specific job requirements while maintaining accuracy about the candidate's background.",
+        **build_tailored_resume_request(job_description, resume_json, analysis_json),
         timeout=60,
-        retries=1
+        retries=1,
+        **_streaming(write_fn)
     )
     
     if not success:
@@ -78,68 +98,65 @@ def generate_tailored_resume(client, resume_data, job_description, analysis):
     # Return the tailored resume text directly
     return response_text
 
+REPORT_DATE_FORMAT = "%B %d, %Y"
+
+@lru_cache(maxsize=1)
+def _report_date(day):
+    """Formats the report date once per calendar day."""
+    return f"{day:{REPORT_DATE_FORMAT}}"
+
+def _bullets(items):
+    """Formats items as a markdown bullet list."""
+    return "".join(f"- {item}\n" for item in items)
+
+def _numbered(items):
+    """Formats items as a markdown numbered list."""
+    return "".join(f"{i+1}. {item}\n" for i, item in enumerate(items))
+
 def generate_comprehensive_report(resume_data, job_description, analysis, industry_analysis):
     """
     Generates a detailed PDF-ready report with all analyses.
     """
     # For now, we'll generate a structured markdown report that can be saved
-    report_parts = []
-    
-    # Title and header
-    report_parts.append(f"# Resume Analysis Report\n")
-    report_parts.append(f"**Candidate:** {resume_data.get('name', 'Candidate')}\n")
-    report_parts.append(f"**Date:** {datetime.now().strftime('%B %d, %Y')}\n")
-    report_parts.append(f"**Match Score:** {analysis.get('match_score', 0)}%\n")
+    report_parts = [
+        # Title and header
+        "# Resume Analysis Report\n",
+        f"**Candidate:** {resume_data.get('name', 'Candidate')}\n",
+        f"**Date:** {_report_date(date.today())}\n",
+        f"**Match Score:** {analysis.get('match_score', 0)}%\n",
+        # Executive summary
+        "## Executive Summary\n"
+    ]
     
-    # Executive summary
-    report_parts.append("## Executive Summary\n")
     strengths = analysis.get('strengths', [])
     if strengths:
-        report_parts.append("### Key Strengths\n")
-        for strength in strengths:
-            report_parts.append(f"- {strength}\n")
+        report_parts.append("### Key Strengths\n" + _bullets(strengths))
     
     improvement_areas = analysis.get('improvement_areas', [])
     if improvement_areas:
-        report_parts.append("\n### Areas for Improvement\n")
-        for area in improvement_areas:
-            report_parts.append(f"- {area}\n")
+        report_parts.append("\n### Areas for Improvement\n" + _bullets(improvement_areas))
     
     # Detailed Skills Assessment
-    report_parts.append("\n## Skills Assessment\n")
     skills = analysis.get('skills_assessment', {})
-    for skill, rating in skills.items():
-        report_parts.append(f"- **{skill}:** {rating}/100\n")
+    report_parts.append("\n## Skills Assessment\n" + "".join(f"- **{skill}:** {rating}/100\n" for skill, rating in skills.items()))
     
     # Industry Analysis
     if industry_analysis:
-        report_parts.append("\n## Industry Analysis\n")
-        report_parts.append(f"- **Industry:** {industry_analysis.get('industry_identified', 'Unknown')}\n")
-        report_parts.append(f"- **Industry Fit:** {industry_analysis.get('industry_fit_score', 0)}/100\n")
+        report_parts.append(
+            "\n## Industry Analysis\n"
+            f"- **Industry:** {industry_analysis.get('industry_identified', 'Unknown')}\n"
+            f"- **Industry Fit:** {industry_analysis.get('industry_fit_score', 0)}/100\n"
+        )
         
-        industry_trends = industry_analysis.get('industry_trends', [])
-        if industry_trends:
-            report_parts.append("\n### Industry Trends\n")
-            for trend in industry_trends:
-                report_parts.append(f"- {trend}\n")
-                
-        industry_keywords = industry_analysis.get('industry_keywords', [])
-        if industry_keywords:
-            report_parts.append("\n### Key Industry Terms\n")
-            for keyword in industry_keywords:
-                report_parts.append(f"- {keyword}\n")
-                
-        industry_challenges = industry_analysis.get('industry_challenges', [])
-        if industry_challenges:
-            report_parts.append("\n### Industry Challenges\n")
-            for challenge in industry_challenges:
-                report_parts.append(f"- {challenge}\n")
-                
-        competitors = industry_analysis.get('competitors', [])
-        if competitors:
-            report_parts.append("\n### Key Competitors\n")
-            for competitor in competitors:
-                report_parts.append(f"- {competitor}\n")
+        for heading, key in (
+            ("Industry Trends", 'industry_trends'),
+            ("Key Industry Terms", 'industry_keywords'),
+            ("Industry Challenges", 'industry_challenges'),
+            ("Key Competitors", 'competitors')
+        ):
+            items = industry_analysis.get(key, [])
+            if items:
+                report_parts.append(f"\n### {heading}\n" + _bullets(items))
                 
         salary_range = industry_analysis.get('salary_range', {})
         if salary_range and salary_range.get('min', 0) > 0:
@@ -148,38 +165,51 @@ def generate_comprehensive_report(resume_data, job_description, analysis, indust
     # Keyword Analysis
     keywords = analysis.get('keyword_analysis', [])
     if keywords:
-        report_parts.append("\n## Keyword Analysis\n")
-        report_parts.append("Keywords that appear in the job description but are missing or underemphasised in your resume:\n")
-        for keyword in keywords:
-            report_parts.append(f"- {keyword}\n")
+        report_parts.append(
+            "\n## Keyword Analysis\n"
+            "Keywords that appear in the job description but are missing or underemphasised in your resume:\n"
+            + _bullets(keywords)
+        )
     
     # Experience Gap Analysis
     experience_gaps = analysis.get('experience_gap_analysis', [])
     if experience_gaps:
-        report_parts.append("\n## Experience Gap Analysis\n")
-        for gap in experience_gaps:
-            report_parts.append(f"- {gap}\n")
+        report_parts.append("\n## Experience Gap Analysis\n" + _bullets(experience_gaps))
     
     # Recommendations
     recommendations = analysis.get('recommendations', [])
     if recommendations:
-        report_parts.append("\n## Recommendations\n")
-        for i, rec in enumerate(recommendations):
-            report_parts.append(f"{i+1}. {rec}\n")
+        report_parts.append("\n## Recommendations\n" + _numbered(recommendations))
     
     # Final Notes
-    report_parts.append("\n## Next Steps\n")
-    report_parts.append("1. Update your resume based on the recommendations above\n")
-    report_parts.append("2. Prepare for interviews using the interview tips provided separately\n")
-    report_parts.append("3. Research the industry trends and competitors identified\n")
-    report_parts.append("4. Consider applying for the alternate job titles suggested if appropriate\n")
+    report_parts.append(
+        "\n## Next Steps\n"
+        "1. Update your resume based on the recommendations above\n"
+        "2. Prepare for interviews using the interview tips provided separately\n"
+        "3. Research the industry trends and competitors identified\n"
+        "4. Consider applying for the alternate job titles suggested if appropriate\n"
+    )
     
     # Join all parts
     return "".join(report_parts)
 
-def generate_cover_letter(client, resume_data, job_description, analysis):
+def build_cover_letter_request(job_description, resume_json, analysis_json):
+    """
+    Builds the cover letter request without sending it.
+    Returns the prompt and generation settings accepted by the API call helpers.
+    """
+    return {
+        "context": build_candidate_context(job_description, resume_json, analysis_json),
+        "prompt": _COVER_PROMPT,
+        "max_tokens": 2000,
+        "temperature": 0.3,
+        "system": CANDIDATE_SYSTEM_PROMPT
+    }
+
+async def generate_cover_letter(client, resume_data, job_description, analysis, resume_json=None, analysis_json=None, write_fn=None):
     """
     Generates a customised cover letter based on resume, job description, and match analysis.
+    If write_fn is given, the response is streamed and each text chunk is passed to it as it arrives.
     """
     if not resume_data or not job_description or not analysis:
         return "Unable to generate cover letter due to missing data."
@@ -190,57 +220,17 @@ def generate_cover_letter(client, resume_data, job_description, analysis):
     keywords = analysis.get('keyword_analysis', [])
     skills_assessment = analysis.get('skills_assessment', {})
     
-    # Convert data to JSON for the prompt
-    try:
-        resume_json = json.dumps(resume_data, indent=2)
-        analysis_json = json.dumps(analysis, indent=2)
-    except Exception as e:
-        error_tracker.add_error("json_error", "Error preparing data for cover letter", False, str(e))
-        return "Error generating cover letter."
-    
-    prompt = f"""
-    You are an expert career consultant. Based on this candidate's resume and the job description analysis, 
-    create a professional cover letter that highlights their relevant qualifications and fit for the role.
-
-    Job Description:
-    ---
-    {job_description}
-    ---
-
-    Resume Data:
-    ---
-    {resume_json}
-    ---
-    
-    Resume Analysis:
-    ---
-    {analysis_json}
-    ---
-
-    Write a complete, professional cover letter that:
-    1. Includes a proper salutation (use "Dear Hiring Manager" if no specific recipient is known)
-    2. Has an engaging introduction that mentions the specific role they're applying for
-    3. Highlights 2-3 of the candidate's key strengths and qualifications that match the job requirements
-    4. Uses specific examples from their experience to demonstrate these qualifications
-    5. Addresses any potential gaps or concerns tactfully (if relevant)
-    6. Incorporates relevant keywords from the job description naturally
-    7. Expresses enthusiasm for the role and organisation
-    8. Includes a strong closing paragraph with a call to action
-    9. Uses a professional sign-off
-
-    The cover letter should be 3-4 paragraphs, professional in tone but conversational, and tailored specifically to this candidate and position.
-    Use British English spelling and grammar conventions.
-    """
-
+    # Convert data to JSON for the prompt, unless the orchestrator already did
+    resume_json = resume_json or to_prompt_json(resume_data)
+    analysis_json = analysis_json or to_prompt_json(analysis)
+    
     # Use enhanced API call with timeout
-    success, response_text = call_anthropic_api_with_timeout(
+    success, response_text = await acall_anthropic_api_with_timeout(
         client=client,
-        prompt=prompt,
-        max_tokens=2000,
-        temperature=0.3,
-        system="You are a professional career consultant specialising in cover letter writing. Create a tailored, effective cover letter using the candidate's strengths and the job requirements.",
+        **build_cover_letter_request(job_description, resume_json, analysis_json),
         timeout=45,
-        retries=1
+        retries=1,
+        **_streaming(write_fn)
     )
     
     if not success:
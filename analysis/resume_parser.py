@@ -1,10 +1,112 @@
-import json
-from functools import lru_cache
+import hashlib
+import re
+import threading
+import orjson
 from utils.error_tracker import error_tracker
 from utils.api_client import call_anthropic_api_with_timeout
-from utils.json_parser import extract_json_from_string
+from utils.json_parser import JsonObjectScanner, parse_json_from_string
+
+# Parsed resumes keyed by content digest and candidate name; the client is not part of the key
+PARSE_CACHE_SIZE = 32
+_PARSE_CACHE = {}
+_PARSE_CACHE_LOCK = threading.Lock()
+
+def _parse_cache_key(resume_text, candidate_name):
+    """Builds a compact cache key from a BLAKE2b digest of the resume text."""
+    return hashlib.blake2b(resume_text.encode(), digest_size=16).hexdigest() + "|" + candidate_name
+
+def _remember_parsed_resume(cache_key, parsed_data):
+    """Stores a parsed resume, evicting the oldest entry once the cache is full."""
+    with _PARSE_CACHE_LOCK:
+        _PARSE_CACHE[cache_key] = parsed_data
+        if len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            del _PARSE_CACHE[next(iter(_PARSE_CACHE))]
+
+# Local pre-extraction of the fields deterministic patterns handle reliably
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Spaces and tabs only: a newline would join digits from consecutive lines, e.g. stacked date ranges
+_PHONE_RE = re.compile(r"(?<![\w+])\+?\d[\d \t().-]{7,}\d(?!\w)")
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+|(?:linkedin|github)\.com/\S+", re.IGNORECASE)
+_SECTION_HEADINGS = {
+    "education": ("education", "academic background", "qualifications"),
+    "work_experience": ("experience", "work experience", "professional experience", "employment", "employment history", "work history"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "competencies"),
+    "certifications": ("certifications", "certificates", "licences", "licenses")
+}
+_HEADING_LOOKUP = {heading: section for section, headings in _SECTION_HEADINGS.items() for heading in headings}
+_SKILL_SPLIT_RE = re.compile(r"[,;|\u2022\n]+|\s[-*]\s|^[-*]\s", re.MULTILINE)
+PREFILLED_MAX_TOKENS = 1000
+
+def _split_sections(resume_text):
+    """Splits resume text into known sections by matching short heading lines."""
+    sections = {}
+    current = None
+    for line in resume_text.splitlines():
+        heading = line.strip().strip(":").strip().lower()
+        if len(heading) <= 40 and heading in _HEADING_LOOKUP:
+            current = _HEADING_LOOKUP[heading]
+            sections.setdefault(current, [])
+        elif current is not None:
+            sections[current].append(line)
+    return {section: "\n".join(lines).strip() for section, lines in sections.items()}
+
+def pre_extract_resume(resume_text):
+    """
+    Extracts contact details, profile links, section text and candidate skills with regexes.
+    Runs locally before the LLM call so those fields never depend on the model.
+    """
+    email = _EMAIL_RE.search(resume_text)
+    # At least nine digits, so date ranges such as "2019 - 2023" are not taken for a number
+    phone = next((match for match in _PHONE_RE.finditer(resume_text)
+                  if sum(char.isdigit() for char in match.group(0)) >= 9), None)
+    sections = _split_sections(resume_text)
+    skills = []
+    for item in _SKILL_SPLIT_RE.split(sections.get("skills", "")):
+        item = item.strip(" \t-*:.")
+        if item and len(item) <= 40 and item not in skills:
+            skills.append(item)
+    return {
+        "contact_info": {
+            "email": email.group(0).rstrip(".") if email else None,
+            "phone": " ".join(phone.group(0).split()) if phone else None
+        },
+        "links": [url.rstrip(".,;)") for url in _URL_RE.findall(resume_text)],
+        "sections": sections,
+        "skill_candidates": skills
+    }
+
+def _merge_prefilled(parsed_data, prefilled):
+    """Fills fields the model left empty from the local pre-extraction."""
+    contact_info = parsed_data["contact_info"]
+    for field, value in prefilled["contact_info"].items():
+        if value and not contact_info.get(field):
+            contact_info[field] = value
+    if prefilled["links"] and not contact_info.get("links"):
+        contact_info["links"] = prefilled["links"]
+    if prefilled["skill_candidates"] and not parsed_data["skills"].get("technical"):
+        parsed_data["skills"]["technical"] = prefilled["skill_candidates"]
+    return parsed_data
+
+# Fallback structure for JSON parsing failures, serialised once. "name" and
+# "original_filename" are filled in per candidate by the field validation below.
+_FALLBACK_RESUME_JSON = orjson.dumps({
+    "contact_info": {"email": None, "phone": None},
+    "education": [],
+    "work_experience": [],
+    "skills": {"technical": [], "soft": []},
+    "certifications": [],
+    "parsing_error": "JSON parsing failed"
+}).decode()
+
+def _fallback_resume(candidate_name, prefilled=None):
+    """Returns a fresh fallback structure for the given candidate, keeping any pre-extracted fields."""
+    fallback = orjson.loads(_FALLBACK_RESUME_JSON)
+    fallback["name"] = candidate_name
+    fallback["original_filename"] = candidate_name
+    if prefilled is not None:
+        _merge_prefilled(fallback, prefilled)
+    return fallback
 
-@lru_cache(maxsize=10)  # Cache for performance
 def parse_resume(client, resume_text, candidate_name):
     """
     Parses a resume and returns a dictionary with structured data.
@@ -24,11 +126,25 @@ def parse_resume(client, resume_text, candidate_name):
             "parsing_error": "Text extraction failed or insufficient content"
         }
 
+    cache_key = _parse_cache_key(resume_text, candidate_name)
+    with _PARSE_CACHE_LOCK:
+        cached = _PARSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Fill contact details locally; the model then only returns them when the regexes missed
+    prefilled = pre_extract_resume(resume_text)
+    contact_prefilled = all(prefilled["contact_info"].values())
+    if contact_prefilled:
+        contact_line = '- "contact_info": (already extracted, return an empty object {})'
+    else:
+        contact_line = '- "contact_info": (object with "email" and "phone" keys, strings, null if not found)'
+
     prompt = f"""
     Please extract the following information from the resume provided below for candidate '{candidate_name}'.
     Structure the output as a single JSON object containing these keys:
     - "name": (string, if found, otherwise use '{candidate_name}')
-    - "contact_info": (object with "email" and "phone" keys, strings, null if not found)
+    {contact_line}
     - "education": (array of strings or objects describing education, empty array if none)
     - "work_experience": (array of strings or objects describing work experience including years/duration, empty array if none)
     - "skills": (object with "technical" and "soft" keys, each containing an array of strings, empty arrays if none)
@@ -47,17 +163,19 @@ def parse_resume(client, resume_text, candidate_name):
     success, response_text = call_anthropic_api_with_timeout(
         client=client,
         prompt=prompt,
-        max_tokens=1500,
+        max_tokens=PREFILLED_MAX_TOKENS if contact_prefilled else 1500,
         temperature=0.0,
         system="You are an expert resume parser. Extract structured information accurately and return ONLY a valid JSON object as specified.",
         timeout=45,  # 45 second timeout
-        retries=1    # 1 retry attempt
+        retries=1,   # 1 retry attempt
+        stream=True,
+        on_text=JsonObjectScanner().feed  # Stop reading as soon as the JSON object is complete
     )
 
     if not success:
         error_tracker.add_error("api_error", f"API call failed during resume parsing: {response_text}", True)
         # Return fallback structure on API failure
-        return {
+        return _merge_prefilled({
             "name": candidate_name,
             "contact_info": {"email": None, "phone": None},
             "education": [],
@@ -66,50 +184,36 @@ def parse_resume(client, resume_text, candidate_name):
             "certifications": [],
             "original_filename": candidate_name,
             "parsing_error": f"API Error: {response_text}"
-        }
-
-    # Prepare fallback structure for JSON parsing failures
-    fallback_structure = {
-        "name": candidate_name,
-        "contact_info": {"email": None, "phone": None},
-        "education": [],
-        "work_experience": [],
-        "skills": {"technical": [], "soft": []},
-        "certifications": [],
-        "original_filename": candidate_name,
-        "parsing_error": "JSON parsing failed"
-    }
+        }, prefilled)
 
     # Extract JSON with structured fallbacks
-    json_string = extract_json_from_string(response_text, json.dumps(fallback_structure))
+    parsed_data = parse_json_from_string(response_text, _FALLBACK_RESUME_JSON)
     
-    try:
-        parsed_data = json.loads(json_string)
+    # Ensure it's a dictionary
+    if not isinstance(parsed_data, dict):
+        error_tracker.add_error("json_error", f"Parsing returned {type(parsed_data).__name__} instead of a dictionary.", True)
+        return _fallback_resume(candidate_name, prefilled)
         
-        # Ensure it's a dictionary
-        if not isinstance(parsed_data, dict):
-            error_tracker.add_error("json_error", f"Parsing returned {type(parsed_data).__name__} instead of a dictionary.", True)
-            return fallback_structure
-            
-        # Validate and ensure essential fields exist
-        if 'original_filename' not in parsed_data:
-            parsed_data['original_filename'] = candidate_name
-        if 'name' not in parsed_data or not parsed_data['name']:
-            parsed_data['name'] = candidate_name
+    # Validate and ensure essential fields exist
+    if 'original_filename' not in parsed_data:
+        parsed_data['original_filename'] = candidate_name
+    if 'name' not in parsed_data or not parsed_data['name']:
+        parsed_data['name'] = candidate_name
+    
+    # Ensure proper structure for nested objects
+    if 'contact_info' not in parsed_data or not isinstance(parsed_data['contact_info'], dict):
+        parsed_data['contact_info'] = {"email": None, "phone": None}
+    if 'skills' not in parsed_data or not isinstance(parsed_data['skills'], dict):
+        parsed_data['skills'] = {"technical": [], "soft": []}
         
-        # Ensure proper structure for nested objects
-        if 'contact_info' not in parsed_data or not isinstance(parsed_data['contact_info'], dict):
-            parsed_data['contact_info'] = {"email": None, "phone": None}
-        if 'skills' not in parsed_data or not isinstance(parsed_data['skills'], dict):
-            parsed_data['skills'] = {"technical": [], "soft": []}
+    # Ensure arrays for collections
+    for field in ['education', 'work_experience', 'certifications']:
+        if field not in parsed_data or not isinstance(parsed_data[field], list):
+            parsed_data[field] = []
+
+    # Merge rather than overwrite: local extractions fill whatever the model left empty
+    _merge_prefilled(parsed_data, prefilled)
             
-        # Ensure arrays for collections
-        for field in ['education', 'work_experience', 'certifications']:
-            if field not in parsed_data or not isinstance(parsed_data[field], list):
-                parsed_data[field] = []
-                
-        return parsed_data
-        
-    except json.JSONDecodeError as json_e:
-        error_tracker.add_error("json_error", f"Failed to decode JSON response: {json_e}", True)
-        return fallback_structure
+    if 'parsing_error' not in parsed_data:
+        _remember_parsed_resume(cache_key, parsed_data)
+    return parsed_data
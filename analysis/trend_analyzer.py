@@ -1,112 +1,307 @@
-import pandas as pd
-import altair as alt
+import hashlib
+import heapq
+import os
+from collections import deque
+import numpy as np
+import orjson
+import pyarrow as pa
 import streamlit as st
 from datetime import datetime
+from utils.error_tracker import error_tracker
 
-def store_analysis_history(resume_data, job_description, analysis):
+# Number of most recent analyses kept for trend tracking
+ANALYSIS_HISTORY_SIZE = 10
+# Each user's last ANALYSIS_HISTORY_SIZE analyses are saved to a JSONL file here, so they outlive the browser session
+HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".careervertex")
+
+def _clamp_rating(value):
+    """Coerces a 0-100 score from the model to an int, or None when it is not numeric."""
+    try:
+        return int(max(0, min(100, float(value))))
+    except (TypeError, ValueError):
+        return None
+
+class AnalysisHistory:
     """
-    Stores analysis history in session state for trend tracking.
+    Bounded analysis history stored column-wise: one deque per field and one per skill.
+    Charts and statistics read whole columns, so no per-entry dicts need flattening;
+    the deques evict the oldest entry.
     """
-    # Initialize history if it doesn't exist
-    if 'analysis_history' not in st.session_state:
-        st.session_state['analysis_history'] = []
-        
-    # Create a record of this analysis
-    timestamp = datetime.now().isoformat()
+    FIELDS = ("timestamp", "resume_name", "job_title", "match_score", "analysis_id")
+
+    def __init__(self, maxlen=ANALYSIS_HISTORY_SIZE, path=None):
+        self.maxlen = maxlen
+        # JSONL file the analyses are appended to, or None to keep them in memory only
+        self.path = path
+        self.columns = {field: deque(maxlen=maxlen) for field in self.FIELDS}
+        self.skills = {}
+        # Display name per skill, worked out once when the skill is first seen
+        self.skill_labels = {}
+        # Bumped on every append; derived results (charts, statistics) are memoised against it
+        self.version = 0
+        self.derived_cache = {}
+
+    def __len__(self):
+        return len(self.columns["timestamp"])
+
+    def append(self, skills_assessment, **fields):
+        """Adds one analysis; skills missing from it are recorded as None."""
+        self.version += 1
+        for field in self.FIELDS:
+            self.columns[field].append(fields[field])
+        skills_assessment = {skill: _clamp_rating(rating) for skill, rating in skills_assessment.items()}
+        for skill, column in self.skills.items():
+            column.append(skills_assessment.get(skill))
+        for skill, rating in skills_assessment.items():
+            if skill not in self.skills:
+                # Pad a newly seen skill so it lines up with the earlier entries
+                column = deque([None] * (len(self) - 1), maxlen=self.maxlen)
+                column.append(rating)
+                self.skills[skill] = column
+                self.skill_labels[skill] = _skill_label(skill)
+
+def _history_path(user):
+    """Per-user history file; the login name is hashed so it does not appear on disk."""
+    return os.path.join(HISTORY_DIR, f"history-{hashlib.sha256(user.encode()).hexdigest()[:16]}.jsonl")
+
+def load_analysis_history(user, maxlen=ANALYSIS_HISTORY_SIZE):
+    """
+    Loads a user's saved analyses into a new AnalysisHistory that keeps saving to the
+    same file. Only the last maxlen lines are kept while reading; unreadable lines are skipped.
+    """
+    history = AnalysisHistory(maxlen, path=_history_path(user))
+    try:
+        with open(history.path, "rb") as f:
+            lines = deque(f, maxlen=maxlen)
+    except FileNotFoundError:
+        return history
+    except OSError as e:
+        error_tracker.add_error("history_error", "Could not read your saved analysis history", False, str(e))
+        return history
+    
+    for line in lines:
+        try:
+            record = orjson.loads(line)
+            history.append(record.pop('skills_assessment'), **record)
+        except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+            continue
+    return history
+
+def _save_records(history, records):
+    """
+    Adds analysis records to the history file, if the history has one. Only the last maxlen
+    records are ever loaded, so the file is rewritten with just those rather than appended to.
+    """
+    if history.path is None or not records:
+        return
+    try:
+        os.makedirs(os.path.dirname(history.path), exist_ok=True)
+        try:
+            with open(history.path, "rb") as f:
+                lines = deque((line if line.endswith(b"\n") else line + b"\n" for line in f), maxlen=history.maxlen)
+        except FileNotFoundError:
+            lines = deque(maxlen=history.maxlen)
+        lines.extend(orjson.dumps(record) + b"\n" for record in records)
+        # Written beside the file and swapped in, so an interrupted save keeps the old history
+        temp_path = history.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(b"".join(lines))
+        os.replace(temp_path, history.path)
+    except (OSError, TypeError) as e:
+        error_tracker.add_error("history_error", "Could not save your analysis history", False, str(e))
+
+def _analysis_history():
+    """
+    Returns the session's analysis history, creating it on first use: loaded from the
+    signed-in user's history file, or kept in memory only when nobody is signed in.
+    """
+    # Session state goes through Streamlit's proxy on every access, so callers look it up once
+    history = st.session_state.get('analysis_history')
+    if history is None:
+        user = st.session_state.get('authenticated_user')
+        history = load_analysis_history(user) if user else AnalysisHistory()
+        st.session_state['analysis_history'] = history
+    return history
+
+def _append_analysis(history, resume_data, job_description, analysis, timestamp):
+    """Adds one analysis record to the history and returns it for saving."""
     resume_name = resume_data.get('name', 'Unknown')
-    match_score = analysis.get('match_score', 0)
+    match_score, skills_assessment = _clamp_rating(analysis.get('match_score', 0)) or 0, analysis.get('skills_assessment', {})
     
     # Extract job title from description (simple approach)
     job_title = "Unknown Position"
-    first_line = job_description.strip().split('\n')[0]
+    first_line = job_description.lstrip().partition('\n')[0].rstrip()
     if len(first_line) < 100:  # Likely a title
         job_title = first_line
         
-    # Create history entry
-    entry = {
+    # Add to history; the oldest entry is dropped once it is full
+    record = {
+        "skills_assessment": skills_assessment or {},
         "timestamp": timestamp,
         "resume_name": resume_name,
         "job_title": job_title,
         "match_score": match_score,
-        "skills_assessment": analysis.get('skills_assessment', {}),
-        "analysis_id": len(st.session_state['analysis_history'])
+        "analysis_id": len(history)
     }
-    
-    # Add to history
-    st.session_state['analysis_history'].append(entry)
-    
-    # Keep only the last 10 entries
-    if len(st.session_state['analysis_history']) > 10:
-        st.session_state['analysis_history'] = st.session_state['analysis_history'][-10:]
-        
+    history.append(**record)
+    return record
+
+def store_analysis_history(resume_data, job_description, analysis):
+    """
+    Stores analysis history in session state for trend tracking, and in the user's
+    history file when someone is signed in.
+    """
+    history = _analysis_history()
+    record = _append_analysis(history, resume_data, job_description, analysis, datetime.now().isoformat())
+    _save_records(history, [record])
     return True
 
-def generate_trend_charts():
+def store_analysis_history_batch(analyses):
+    """
+    Stores several (resume_data, job_description, analysis) tuples in one go, e.g. after
+    scoring many resumes. Session state is looked up once, all records share one timestamp,
+    only the records that still fit in the bounded history are built, and the history file
+    is written once.
+    """
+    history = _analysis_history()
+    timestamp = datetime.now().isoformat()
+    records = [
+        _append_analysis(history, resume_data, job_description, analysis, timestamp)
+        for resume_data, job_description, analysis in analyses[-history.maxlen:]
+    ]
+    _save_records(history, records)
+    return True
+
+def _to_arrow_table(columns, scores, labels):
+    """
+    Packs chart columns into a pyarrow Table, which Streamlit serialises for the chart
+    directly instead of converting the data to a DataFrame first.
+    """
+    arrays = {}
+    for name, values in columns.items():
+        if name in scores:
+            arrays[name] = pa.array(np.asarray(values, dtype=np.uint8))
+        elif name in labels:
+            arrays[name] = pa.array(values, type=pa.string()).dictionary_encode()
+        else:
+            arrays[name] = pa.array(values)
+    return pa.table(arrays)
+
+def _skill_label(skill):
+    """Display name for a skills_assessment key, e.g. 'technical_skills' -> 'Technical Skills'."""
+    return skill.replace('_', ' ').title()
+
+def generate_trend_charts(history):
     """
     Generates charts showing trends across analyses.
+    Takes the AnalysisHistory instead of reading session state, so it also runs outside
+    Streamlit. The specs are memoised on the history against its version, so reruns
+    triggered by unrelated widgets reuse them instead of rebuilding them.
     """
-    if 'analysis_history' not in st.session_state or len(st.session_state['analysis_history']) < 2:
+    if history is None or len(history) < 2:
         return None
-        
-    history = st.session_state['analysis_history']
-    
-    # Create dataframe for analysis
-    df = pd.DataFrame(history)
-    
-    # Extract skill assessment data for easier charting
-    # This flattens the nested dictionary into columns
-    skill_columns = []
-    for idx, entry in enumerate(history):
-        skills = entry.get('skills_assessment', {})
-        for skill, value in skills.items():
-            col_name = f"skill_{skill.replace(' ', '_').lower()}"
-            if col_name not in df.columns:
-                df[col_name] = None
-            df.at[idx, col_name] = value
-            if col_name not in skill_columns:
-                skill_columns.append(col_name)
-    
-    # Ensure timestamps are datetime objects
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return _memoised(history, 'charts', _build_trend_charts)
+
+def trend_statistics(history, top=3):
+    """
+    Summarises the match scores: average, highest and lowest, and the top entries as
+    (job_title, match_score, date) tuples, best first. Memoised like the charts and read
+    straight from the history columns, so reruns do not rebuild a DataFrame.
+    """
+    if history is None or len(history) == 0:
+        return None
+    return _memoised(history, ('statistics', top), lambda history: _build_trend_statistics(history, top))
+
+def _memoised(history, key, build):
+    """Returns build(history), reusing the value cached on the history until it changes."""
+    cached = history.derived_cache.get(key)
+    if cached is not None and cached[0] == history.version:
+        return cached[1]
+    value = build(history)
+    history.derived_cache[key] = (history.version, value)
+    return value
+
+def _build_trend_statistics(history, top):
+    """Computes the match score statistics from the history columns."""
+    scores = history.columns['match_score']
+    # Only the top entries are needed, so select them without sorting the whole history;
+    # like a stable sort, equal scores keep their analysis order
+    best = heapq.nlargest(top, range(len(scores)), key=scores.__getitem__)
+    return {
+        "average": sum(scores) / len(scores),
+        "highest": max(scores),
+        "lowest": min(scores),
+        "best_matches": [
+            (history.columns['job_title'][row], scores[row],
+             datetime.fromisoformat(history.columns['timestamp'][row]).strftime('%B %d, %Y'))
+            for row in best
+        ]
+    }
+
+def _build_trend_charts(history):
+    """Builds the trend chart specs from the analysis history."""
+    match_columns, skill_columns = _trend_columns_from_entries(history)
     
-    # Sort by timestamp
-    df = df.sort_values('timestamp')
+    # Scores are clamped to 0-100 on storage, so they fit in uint8; the repeated
+    # labels are dictionary-encoded, shrinking the Arrow payload sent to the browser
+    match_columns = _to_arrow_table(match_columns, scores=('match_score',), labels=('job_title',))
+    skill_columns = _to_arrow_table(skill_columns, scores=('rating',), labels=('job_title', 'skill'))
     
-    # Create charts
+    # Create charts as (data, Vega-Lite spec) pairs for st.vega_lite_chart; keeping the data
+    # out of the spec lets Streamlit send it as a columnar Arrow table rather than JSON rows
     charts = {}
     
     # 1. Match score over time
-    match_score_chart = alt.Chart(df).mark_line(point=True).encode(
-        x=alt.X('timestamp:T', title='Date'),
-        y=alt.Y('match_score:Q', scale=alt.Scale(domain=[0, 100]), title='Match Score'),
-        tooltip=['job_title', 'match_score', 'timestamp']
-    ).properties(
-        title='Match Score Trend'
-    )
-    charts['match_score'] = match_score_chart
+    charts['match_score'] = (match_columns, {
+        "title": "Match Score Trend",
+        "mark": {"type": "line", "point": True},
+        "encoding": {
+            "x": {"field": "timestamp", "type": "temporal", "title": "Date"},
+            "y": {"field": "match_score", "type": "quantitative", "scale": {"domain": [0, 100]}, "title": "Match Score"},
+            "tooltip": [
+                {"field": "job_title", "type": "nominal"},
+                {"field": "match_score", "type": "quantitative"},
+                {"field": "timestamp", "type": "temporal"}
+            ]
+        }
+    })
     
-    # 2. Skills radar chart (not directly supported in Altair, so we'll fake it with multiple lines)
-    if skill_columns:
-        # Reshape for the skills chart
-        skills_df = df.melt(
-            id_vars=['timestamp', 'job_title', 'analysis_id'],
-            value_vars=skill_columns,
-            var_name='skill',
-            value_name='rating'
-        )
-        
-        # Clean up skill names
-        skills_df['skill'] = skills_df['skill'].str.replace('skill_', '').str.replace('_', ' ').str.title()
-        
-        # Create a comparative skills chart
-        skills_chart = alt.Chart(skills_df).mark_line().encode(
-            x=alt.X('skill:N', title='Skill Category'),
-            y=alt.Y('rating:Q', scale=alt.Scale(domain=[0, 100]), title='Rating'),
-            color=alt.Color('job_title:N', title='Job'),
-            tooltip=['job_title', 'skill', 'rating']
-        ).properties(
-            title='Skills Comparison Across Job Applications'
-        )
-        charts['skills'] = skills_chart
+    # 2. Skills radar chart (not directly supported in Vega-Lite, so we'll fake it with multiple lines)
+    if skill_columns.num_rows:
+        charts['skills'] = (skill_columns, {
+            "title": "Skills Comparison Across Job Applications",
+            "mark": {"type": "line"},
+            "encoding": {
+                "x": {"field": "skill", "type": "nominal", "title": "Skill Category"},
+                "y": {"field": "rating", "type": "quantitative", "scale": {"domain": [0, 100]}, "title": "Rating"},
+                "color": {"field": "job_title", "type": "nominal", "title": "Job"},
+                "tooltip": [
+                    {"field": "job_title", "type": "nominal"},
+                    {"field": "skill", "type": "nominal"},
+                    {"field": "rating", "type": "quantitative"}
+                ]
+            }
+        })
     
     return charts
+
+def _trend_columns_from_entries(history):
+    """
+    Builds the chart columns with a plain Python sort and loop. The history holds at most
+    ANALYSIS_HISTORY_SIZE entries, for which this is far cheaper than building and reshaping DataFrames.
+    """
+    columns = {field: list(column) for field, column in history.columns.items()}
+    order = sorted(range(len(history)), key=lambda row: datetime.fromisoformat(columns['timestamp'][row]))
+    match_columns = {field: [columns[field][row] for row in order] for field in ('timestamp', 'job_title', 'match_score')}
+    
+    skills = [(history.skill_labels[skill], list(column)) for skill, column in history.skills.items()]
+    skill_columns = {"job_title": [], "skill": [], "rating": []}
+    for row in order:
+        for label, ratings in skills:
+            if ratings[row] is None:
+                continue
+            skill_columns["job_title"].append(columns['job_title'][row])
+            skill_columns["skill"].append(label)
+            skill_columns["rating"].append(ratings[row])
+    
+    return match_columns, skill_columns
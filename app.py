@@ -1,72 +1,187 @@
+import hashlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-import pandas as pd
-import altair as alt
-import numpy as np
+
+# Import UI modules
+from ui.auth import check_password
+
+# --- App Setup ---
+st.set_page_config(page_title="CareerVertex - Resume Job Match Analyser", layout="wide")
+st.title("CareerVertex - Resume Job Match Analyser")
+st.markdown("*Analyse how well your resume matches a specific job description*")
+
+# Authentication check
+if not check_password():
+    st.stop()
+
+# The remaining modules are imported only once the user is signed in: they pull in anthropic,
+# pandas, numpy and pyarrow, which the login screen does not need
 
 # Import utility modules
 from utils.error_tracker import error_tracker
 from utils.extract_text import extract_text_from_file
 from utils.api_client import initialize_anthropic_client
+from utils.semantic_cache import is_cacheable
 
 # Import analysis modules
 from analysis.resume_parser import parse_resume
-from analysis.job_analyzer import analyze_resume_match, generate_interview_tips
-from analysis.industry_analyzer import analyze_industry_fit
-from analysis.report_generator import generate_comprehensive_report, generate_cover_letter
-from analysis.trend_analyzer import store_analysis_history, generate_trend_charts
+from analysis.trend_analyzer import store_analysis_history, generate_trend_charts, trend_statistics
+from analysis.pipeline import run_full_analysis, run_documents, run_async, submit_document_batch, collect_document_batch
 from analysis.report_generator import generate_comprehensive_report, generate_cover_letter, generate_tailored_resume
 
 # Import UI modules
-from ui.auth import check_password
 from ui.components import (
     display_match_score, display_strengths_and_improvements,
     display_recommendations, display_keywords, display_trends, 
-    display_resume_summary
+    display_resume_summary, markdown_writer
 )
 from ui.visualizations import create_skills_chart
 
-# --- App Setup ---
-st.set_page_config(page_title="CareerVertex - Resume Job Match Analyser", layout="wide")
-st.title("CareerVertex - Resume Job Match Analyser")
-st.markdown("*Analyse how well your resume matches a specific job description*")
-
-# Authentication check
-if not check_password():
-    st.stop()
-
-# Initialize Anthropic client
+# Initialize Anthropic client; it is created once per process and shared by reruns
 client = initialize_anthropic_client()
 if not client:
+    # Do not keep the missing client cached, so adding the secret takes effect on the next rerun
+    initialize_anthropic_client.clear()
     st.stop()
 
-# Initialize session state more robustly
-for key in ['job_description', 'resume_file_name', 'resume_text', 'resume_data', 
-           'analysis_results', 'interview_tips', 'processing_started', 'processing_completed',
-           'industry_analysis', 'comprehensive_report', 'cover_letter', 'tailored_resume']:
-    if key not in st.session_state:
-        st.session_state[key] = None
-        
-# For job description, initialize as empty string
-if st.session_state['job_description'] is None:
-    st.session_state['job_description'] = ""
-    
-# For flags, initialize as False
-for flag in ['processing_started', 'processing_completed']:
-    if st.session_state[flag] is None:
-        st.session_state[flag] = False
+# Session state defaults, applied once per session: the job description starts empty,
+# the processing flags start False and every result starts as None
+SESSION_DEFAULTS = {
+    'job_description': "",
+    'processing_started': False,
+    'processing_completed': False,
+    **dict.fromkeys([
+        'resume_file_name', 'resume_text', 'resume_data', 'analysis_results', 'interview_tips',
+        'industry_analysis', 'comprehensive_report', 'comprehensive_report_tokens', 'cover_letter', 'tailored_resume'
+    ])
+}
+
+for key, default in SESSION_DEFAULTS.items():
+    st.session_state.setdefault(key, default)
+
+# --- Cached Analyses ---
+# Identical resume and job description pairs reuse their results across reruns and sessions.
+# The inputs are keyed by their SHA-256 hashes; the underscored arguments are not hashed.
+ANALYSIS_CACHE_TTL = 3600  # One hour in seconds
+
+def content_hash(text):
+    """Returns the SHA-256 hex digest used as the cache key for a document's text."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+@st.cache_data(show_spinner=False, ttl=ANALYSIS_CACHE_TTL)
+def cached_parse_resume(resume_hash, resume_name, _client, _resume_text):
+    """
+    Parses a resume once per distinct text and file name. A failed parse raises ValueError,
+    which st.cache_data does not cache, so the same file can be retried.
+    """
+    resume_data = parse_resume(_client, _resume_text, resume_name)
+    if not resume_data or 'parsing_error' in resume_data:
+        raise ValueError("Resume could not be parsed")
+    return resume_data
+
+@st.cache_resource(show_spinner=False)
+def stored_full_analyses():
+    """
+    Full analyses of each distinct resume and job description, shared across sessions and keyed
+    by (resume_hash, jd_hash) with the time they were stored. A plain dict rather than st.cache_data,
+    because the pipeline's progress writes to page elements cannot be replayed on a later hit.
+    """
+    return {}
+
+def cached_full_analysis(resume_hash, jd_hash, client, resume_data, job_description, on_section):
+    """
+    Returns the full analysis for a resume and job description, running the pipeline only on a miss.
+    on_section(name, data) is called for every section either way: as each one arrives on a miss,
+    or in turn from the stored results on a hit. Results with a failed section are never stored.
+    """
+    stored = stored_full_analyses()
+    now = time.time()
+    for key in [key for key, (stored_at, _) in stored.items() if now - stored_at > ANALYSIS_CACHE_TTL]:
+        stored.pop(key, None)
+
+    entry = stored.get((resume_hash, jd_hash))
+    if entry is not None:
+        results = entry[1]
+        for name, data in results.items():
+            on_section(name, data)
+        return results
+
+    results = run_async(client, run_full_analysis, resume_data, job_description, on_section=on_section)
+    if all(is_cacheable(data) for data in results.values()):
+        stored[(resume_hash, jd_hash)] = (time.time(), results)
+    return results
+
+# --- Background Extraction ---
+# Uploads are extracted on a worker thread, so the page keeps rendering while a file is parsed
+EXTRACTION_POLL_INTERVAL = 0.5  # Seconds between checks for a finished extraction
+
+@st.cache_resource(show_spinner=False)
+def get_extraction_executor():
+    """Returns the process-wide thread pool used for text extraction."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="extract")
+
+def start_extraction(state_key, file):
+    """Starts extracting an uploaded file in the background and keeps the future in session state."""
+    # The worker gets its own copy, so it never shares a file pointer with the script thread
+    file_copy = io.BytesIO(file.getvalue())
+    file_copy.name = file.name
+    st.session_state[state_key] = (file.file_id, get_extraction_executor().submit(extract_text_from_file, file_copy))
+
+def extracted_text(state_key, file):
+    """Returns the file's text, waiting for its background extraction if one was started."""
+    file_id, future = st.session_state.get(state_key) or (None, None)
+    if file_id == file.file_id:
+        return future.result()
+    return extract_text_from_file(file)
+
+@st.fragment(run_every=EXTRACTION_POLL_INTERVAL)
+def await_job_description():
+    """Polls the job description extraction and reruns the page once its text is available."""
+    file_id, future = st.session_state['jd_future']
+    if not future.done():
+        st.info("Extracting job description text...")
+        return
+    del st.session_state['jd_future']
+    jd_text = future.result()
+    if jd_text:
+        st.session_state['job_description'] = jd_text
+    st.rerun()
+
+# --- Pending Document Batch ---
+# Batches take minutes, so their status is checked without waiting, on this interval
+DOCUMENT_BATCH_POLL_INTERVAL = 15  # Seconds
+
+@st.fragment(run_every=DOCUMENT_BATCH_POLL_INTERVAL)
+def await_document_batch():
+    """
+    Checks the pending document batch once per run, without blocking, and reruns the page
+    once its documents are stored. Only this fragment reruns on the interval.
+    """
+    documents = collect_document_batch(client, st.session_state['document_batch_id'], max_wait=0)
+    if documents is None:
+        st.info("Your documents are still being generated. This updates automatically when they are ready.")
+        return
+    st.session_state.update(documents)
+    st.session_state['show_interview_tips'] = True
+    del st.session_state['document_batch_id']
+    st.session_state['document_batch_ready'] = True
+    st.rerun()
 
 # Define callback functions to handle state management
 def handle_job_file_upload():
     """Callback function for when a job description file is uploaded"""
     jd_file = st.session_state.get("jd_uploader")
     if jd_file:
-        with st.spinner("Extracting job description text..."):
-            jd_text = extract_text_from_file(jd_file)
-            if jd_text:
-                st.session_state['job_description'] = jd_text
+        start_extraction('jd_future', jd_file)
 
 def handle_resume_file_upload():
     """Callback function for when a resume file is uploaded"""
+    # Start extracting right away, so the text is usually ready by the time the analysis starts
+    resume_file = st.session_state.get("resume_uploader")
+    if resume_file:
+        start_extraction('resume_future', resume_file)
     # Clear previous results when a new resume is uploaded
     st.session_state['resume_file_name'] = None
     st.session_state['resume_text'] = None
@@ -104,6 +219,8 @@ with col1:
         key="jd_uploader",
         on_change=handle_job_file_upload
     )
+    if st.session_state.get('jd_future'):
+        await_job_description()
 
 with col2:
     st.subheader("Your Resume")
@@ -121,7 +238,7 @@ with col2:
         # Preview button to show extracted text
         if st.button("Preview Extracted Text"):
             with st.spinner("Extracting text from resume..."):
-                resume_text = extract_text_from_file(resume_file)
+                resume_text = extracted_text('resume_future', resume_file)
                 if resume_text:
                     with st.expander("Extracted Resume Text"):
                         st.text(resume_text)
@@ -154,7 +271,7 @@ if st.session_state['processing_started'] and not st.session_state['processing_c
             if current_resume_name != st.session_state['resume_file_name']:
                 # Step 1: Extract text from resume
                 status_text.text("Extracting text from your resume...")
-                resume_text = extract_text_from_file(resume_file)
+                resume_text = extracted_text('resume_future', resume_file)
                 progress_bar.progress(0.15)
                 
                 if resume_text:
@@ -164,32 +281,61 @@ if st.session_state['processing_started'] and not st.session_state['processing_c
                     
                     # Step 2: Parse resume
                     status_text.text("Parsing resume information...")
-                    resume_data = parse_resume(client, resume_text, current_resume_name)
+                    resume_hash = content_hash(resume_text)
+                    try:
+                        resume_data = cached_parse_resume(resume_hash, current_resume_name, client, resume_text)
+                    except ValueError:
+                        resume_data = None
                     progress_bar.progress(0.30)
                     
-                    if resume_data and 'parsing_error' not in resume_data:
-                        # Step 3: Analyse match - main analysis
-                        status_text.text("Analysing match with job description...")
-                        analysis_results = analyze_resume_match(client, resume_data, job_description)
-                        progress_bar.progress(0.50)
-                        
-                        # Step 4: Industry analysis - new feature
-                        status_text.text("Conducting industry-specific analysis...")
-                        industry_analysis = analyze_industry_fit(client, resume_data, job_description, analysis_results)
-                        progress_bar.progress(0.65)
-                        
-                        # Step 5: Generate interview tips
-                        status_text.text("Generating interview preparation tips...")
-                        interview_tips = generate_interview_tips(client, resume_data, job_description, analysis_results)
-                        progress_bar.progress(0.80)
-                        
-                        # Step 6: Generate comprehensive report
-                        status_text.text("Creating comprehensive analysis report...")
-                        comprehensive_report = generate_comprehensive_report(resume_data, job_description, analysis_results, industry_analysis)
-                        progress_bar.progress(0.95)
-                        
-                        # Store analysis history for trend analysis
-                        store_analysis_history(resume_data, job_description, analysis_results)
+                    if resume_data:
+                        # Steps 3-5: Match analysis, then industry analysis, interview tips,
+                        # tailored resume and cover letter concurrently
+                        status_text.text("Analysing match, industry fit and preparing your documents...")
+                        section_labels = {
+                            "analysis": "Match analysis",
+                            "industry_analysis": "Industry analysis",
+                            "interview_tips": "Interview tips",
+                            "tailored_resume": "Tailored resume",
+                            "cover_letter": "Cover letter"
+                        }
+                        sections_done = []
+                        # Early previews, filled as their sections arrive and cleared once the full results render below
+                        score_preview, industry_preview = st.empty(), st.empty()
+
+                        def show_section(name, data):
+                            # Report each section as soon as it arrives instead of after the slowest call
+                            sections_done.append(section_labels[name])
+                            st.session_state[name if name != "analysis" else "analysis_results"] = data
+                            if name == "analysis":
+                                with score_preview.container():
+                                    display_match_score(data.get('match_score', 0))
+                                # Store analysis history for trend analysis while the other calls are in flight
+                                store_analysis_history(resume_data, job_description, data)
+                            elif name == "industry_analysis":
+                                if data:
+                                    industry_preview.markdown(
+                                        f"**Industry:** {data.get('industry_identified', 'Unknown')} — "
+                                        f"**Industry Fit:** {data.get('industry_fit_score', 0)}/100"
+                                    )
+                                # Step 6: The report only needs the match and industry analyses, so build it
+                                # now rather than after the tailored resume and cover letter finish
+                                report = generate_comprehensive_report(
+                                    resume_data, job_description, st.session_state['analysis_results'], data
+                                )
+                                st.session_state['comprehensive_report'] = report
+                                # Counted once here rather than on every rerun of the Report tab
+                                st.session_state['comprehensive_report_tokens'] = len(report.split())
+                            progress_bar.progress(0.30 + 0.13 * len(sections_done))
+                            status_text.text(f"Ready: {', '.join(sections_done)}. Still working on the rest...")
+
+                        pipeline_results = cached_full_analysis(
+                            resume_hash, content_hash(job_description), client, resume_data, job_description, show_section
+                        )
+                        analysis_results = pipeline_results['analysis']
+                        industry_analysis = pipeline_results['industry_analysis']
+                        interview_tips = pipeline_results['interview_tips']
+                        comprehensive_report = st.session_state['comprehensive_report']
                         
                         # Store results in session state
                         st.session_state['resume_data'] = resume_data
@@ -197,6 +343,10 @@ if st.session_state['processing_started'] and not st.session_state['processing_c
                         st.session_state['interview_tips'] = interview_tips
                         st.session_state['industry_analysis'] = industry_analysis
                         st.session_state['comprehensive_report'] = comprehensive_report
+                        st.session_state['tailored_resume'] = pipeline_results['tailored_resume']
+                        st.session_state['cover_letter'] = pipeline_results['cover_letter']
+                        score_preview.empty()
+                        industry_preview.empty()
                         
                         progress_bar.progress(1.0)
                         status_text.success("Analysis complete! View your results below.")
@@ -275,7 +425,7 @@ if st.session_state['analysis_results'] is not None:
         with qa_col1:
             if st.button("Generate Cover Letter", use_container_width=True):
                 with st.spinner("Creating your customised cover letter..."):
-                    cover_letter = generate_cover_letter(client, resume_data, job_description, analysis_results)
+                    cover_letter = run_async(client, generate_cover_letter, resume_data, job_description, analysis_results, write_fn=markdown_writer(st.empty()))
                     st.session_state['cover_letter'] = cover_letter
                     st.success("Cover letter created! Check the Full Report tab.")
         
@@ -287,9 +437,46 @@ if st.session_state['analysis_results'] is not None:
         with qa_col3:
             if st.button("Tailor Resume", use_container_width=True):
                 with st.spinner("Creating your tailored resume..."):
-                    tailored_resume = generate_tailored_resume(client, resume_data, job_description, analysis_results)
+                    tailored_resume = run_async(client, generate_tailored_resume, resume_data, job_description, analysis_results, write_fn=markdown_writer(st.empty()))
                     st.session_state['tailored_resume'] = tailored_resume
                     st.success("Tailored resume created! Check the Full Report tab.")
+        
+        # All three documents at once, concurrently: the wait is that of the slowest rather than their sum
+        if st.button("Generate all documents", type="primary", use_container_width=True):
+            document_labels = {
+                "cover_letter": "Cover letter",
+                "tailored_resume": "Tailored resume",
+                "interview_tips": "Interview tips"
+            }
+            # The interview tips come with the full analysis, so they are only generated if missing
+            include_tips = not st.session_state.get('interview_tips')
+            document_status = {
+                name: st.empty() for name in document_labels if name != "interview_tips" or include_tips
+            }
+            for name, placeholder in document_status.items():
+                placeholder.info(f"{document_labels[name]}: generating...")
+
+            def show_document(name, data):
+                st.session_state[name] = data
+                document_status[name].success(f"{document_labels[name]}: ready")
+
+            with st.spinner("Creating your documents..."):
+                run_async(client, run_documents, resume_data, job_description, analysis_results,
+                          on_section=show_document, include_tips=include_tips)
+            st.session_state['show_interview_tips'] = True
+            st.success("All documents created! Check the Detailed Analysis and Full Report tabs.")
+        
+        # All three documents as one Message Batch: cheaper, but finished minutes rather than seconds later.
+        # The batch id lives in session state, so later reruns pick the batch up again.
+        if st.button("Generate all documents as a batch (lower cost)", use_container_width=True):
+            batch_id = submit_document_batch(client, resume_data, job_description, analysis_results)
+            if batch_id:
+                st.session_state['document_batch_id'] = batch_id
+        
+        if st.session_state.get('document_batch_id'):
+            await_document_batch()
+        elif st.session_state.pop('document_batch_ready', False):
+            st.success("All documents created! Check the Detailed Analysis and Full Report tabs.")
     
     # DETAILS TAB
     with details_tab:
@@ -409,43 +596,36 @@ if st.session_state['analysis_results'] is not None:
             st.success(f"We've analyzed {len(st.session_state['analysis_history'])} different job applications. Here's how you're doing!")
             
             # Show performance over time
-            charts = generate_trend_charts()
+            charts = generate_trend_charts(st.session_state.get('analysis_history'))
             if charts:
                 # Match score trend
                 st.subheader("Application Match Score Trend")
-                st.altair_chart(charts.get('match_score'), use_container_width=True)
+                st.vega_lite_chart(*charts['match_score'], use_container_width=True)
                 
                 # Skills comparison across jobs
                 if 'skills' in charts:
                     st.subheader("Skills Assessment Across Applications")
-                    st.altair_chart(charts.get('skills'), use_container_width=True)
+                    st.vega_lite_chart(*charts['skills'], use_container_width=True)
                 
                 # Analysis and insights
                 st.subheader("Trend Insights")
                 
-                # Create a dataframe from the history
-                history = st.session_state['analysis_history']
-                df = pd.DataFrame(history)
-                
-                # Calculate average match score
-                avg_score = df['match_score'].mean()
-                max_score = df['match_score'].max()
-                min_score = df['match_score'].min()
+                # Statistics are memoised on the history, so unrelated reruns reuse them
+                stats = trend_statistics(st.session_state['analysis_history'])
                 
                 st.markdown(f"""
                 📊 **Match Score Statistics:**
-                - **Average Match Score:** {avg_score:.1f}%
-                - **Highest Match Score:** {max_score:.1f}% 
-                - **Lowest Match Score:** {min_score:.1f}%
+                - **Average Match Score:** {stats['average']:.1f}%
+                - **Highest Match Score:** {stats['highest']:.1f}% 
+                - **Lowest Match Score:** {stats['lowest']:.1f}%
                 """)
                 
                 # Show jobs with highest scores
                 st.markdown("### Your Best Matches")
-                best_matches = df.sort_values('match_score', ascending=False).head(3)
-                for i, match in best_matches.iterrows():
+                for job_title, score, analysed_on in stats['best_matches']:
                     st.markdown(f"""
-                    **{match['job_title']}** - {match['match_score']}% match  
-                    *Analyzed on {pd.to_datetime(match['timestamp']).strftime('%B %d, %Y')}*
+                    **{job_title}** - {score}% match  
+                    *Analyzed on {analysed_on}*
                     """)
             else:
                 st.warning("Unable to generate trend charts with the available data.")
@@ -471,8 +651,7 @@ if st.session_state['analysis_results'] is not None:
         # Calculate and display token count for the report
         comprehensive_report = st.session_state.get('comprehensive_report')
         if comprehensive_report:
-            report_tokens = len(comprehensive_report.split())
-            st.info(f"Report length: {report_tokens} tokens")
+            st.info(f"Report length: {st.session_state['comprehensive_report_tokens']} tokens")
         
         # Cover letter section
         if 'cover_letter' in st.session_state and st.session_state['cover_letter']:
@@ -491,7 +670,7 @@ if st.session_state['analysis_results'] is not None:
             # Button to generate cover letter
             if st.button("Generate Custom Cover Letter"):
                 with st.spinner("Creating your customised cover letter..."):
-                    cover_letter = generate_cover_letter(client, resume_data, job_description, analysis_results)
+                    cover_letter = run_async(client, generate_cover_letter, resume_data, job_description, analysis_results, write_fn=markdown_writer(st.empty()))
                     st.session_state['cover_letter'] = cover_letter
                     st.rerun()
 
@@ -512,7 +691,7 @@ if st.session_state['analysis_results'] is not None:
             # Button to generate tailored resume
             if st.button("Generate Tailored Resume"):
                 with st.spinner("Creating your tailored resume..."):
-                    tailored_resume = generate_tailored_resume(client, resume_data, job_description, analysis_results)
+                    tailored_resume = run_async(client, generate_tailored_resume, resume_data, job_description, analysis_results, write_fn=markdown_writer(st.empty()))
                     st.session_state['tailored_resume'] = tailored_resume
                     st.rerun()
         
@@ -538,10 +717,12 @@ if st.session_state['analysis_results'] is not None:
             st.markdown("""
             ### How We Handle Your Data
             
-            - **Session-Based Storage**: Your data is only stored in your current browser session
+            - **Session-Based Storage**: Your resume, job description and generated documents are only stored in your current browser session
+            - **Trend History**: Your last 10 analyses are saved on the app server under your login so your trends carry over between sessions; each keeps only the candidate name from the resume, the job title (first line of the job description), the match score, the skills ratings and the date
+            - **Analysis Cache**: Your analyses, industry insights and interview tips are cached on the app server under your login for up to seven days, so similar job descriptions can reuse them; expired entries are deleted and no other user can read them
             - **No External Database**: We don't save your resume or job descriptions to any external database
             - **No Data Sharing**: Your information is not shared with third parties
-            - **Automatic Cleanup**: All data is automatically erased when you close your browser tab
+            - **Automatic Cleanup**: Session data is automatically erased when you close your browser tab
             
             To manually delete all data, click the "Reset & Analyse Another Resume" button or close this tab.
             """)
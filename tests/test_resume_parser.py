@@ -0,0 +1,11 @@
+from analysis.resume_parser import pre_extract_resume
+
+
+def test_date_ranges_on_consecutive_lines_are_not_a_phone_number():
+    resume_text = "Jane Doe\njane@example.com\n\nExperience\n2015 - 2019\n2019 - 2023\n"
+    assert pre_extract_resume(resume_text)["contact_info"]["phone"] is None
+
+
+def test_phone_number_is_still_found_next_to_date_ranges():
+    resume_text = "Jane Doe\n+44 (0)20 7946 0958\n\nExperience\n2015 - 2019\n2019 - 2023\n"
+    assert pre_extract_resume(resume_text)["contact_info"]["phone"] == "+44 (0)20 7946 0958"
@@ -1,8 +1,22 @@
 # Makes the directory a package
-from ui.auth import check_password
-from ui.components import (
-    display_match_score, display_strengths_and_improvements, 
-    display_recommendations, display_keywords, display_trends,
-    display_resume_summary
-)
-from ui.visualizations import create_skills_chart
+import importlib
+
+# Re-exported names and their submodules, loaded on first access (PEP 562), so importing
+# ui.auth for the login screen does not also load the components and visualizations
+_EXPORTS = {
+    "check_password": "ui.auth",
+    "display_match_score": "ui.components",
+    "display_strengths_and_improvements": "ui.components",
+    "display_recommendations": "ui.components",
+    "display_keywords": "ui.components",
+    "display_trends": "ui.components",
+    "display_resume_summary": "ui.components",
+    "create_skills_chart": "ui.visualizations"
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -1,6 +1,11 @@
 import streamlit as st
 import hmac
 
+@st.cache_resource(show_spinner=False)
+def _password_table():
+    """Login names mapped to their UTF-8 encoded passwords, read from the secrets once per process."""
+    return {user: str(password).encode("utf-8") for user, password in st.secrets.get("passwords", {}).items()}
+
 def check_password():
     """Returns `True` if the user had a correct password."""
 
@@ -13,24 +18,21 @@ def check_password():
 
     def password_entered():
         """Checks whether a password entered by the user is correct."""
-        # Ensure secrets and passwords structure exists before accessing
-        if "passwords" in st.secrets and st.session_state["username"] in st.secrets["passwords"]:
-            stored_password = st.secrets.passwords[st.session_state["username"]]
-            # Ensure stored_password is a string or bytes for hmac.compare_digest
-            if isinstance(stored_password, (str, bytes)):
-                 if hmac.compare_digest(
-                    st.session_state["password"],
-                    str(stored_password) # Ensure it's compared as string if needed
-                 ):
-                    st.session_state["password_correct"] = True
-                    del st.session_state["password"]  # Don't store the username or password.
-                    del st.session_state["username"]
-                    return # Exit function on success
-            else:
-                 st.error(f"Password configuration error for user {st.session_state['username']}.")
-
-        # If checks failed or structure doesn't exist
-        st.session_state["password_correct"] = False
+        # Unknown users are compared against an empty password, so both paths do the same work
+        passwords = _password_table()
+        user_known = st.session_state["username"] in passwords
+        stored_password = passwords.get(st.session_state["username"], b"")
+        # Compare bytes: str inputs must be ASCII-only and take a slower path
+        password_matches = hmac.compare_digest(st.session_state["password"].encode("utf-8"), stored_password)
+        
+        if user_known and password_matches:
+            st.session_state["password_correct"] = True
+            # Keep only the login name, which keys the user's saved analysis history
+            st.session_state["authenticated_user"] = st.session_state["username"]
+            del st.session_state["password"]  # Don't store the password or the form inputs.
+            del st.session_state["username"]
+        else:
+            st.session_state["password_correct"] = False
 
 
     # Return True if the username + password is validated.
@@ -1,5 +1,14 @@
+import html
 import streamlit as st
 
+def markdown_writer(placeholder):
+    """Returns a write_fn that appends streamed text chunks and re-renders them in the placeholder."""
+    chunks = []
+    def write(text):
+        chunks.append(text)
+        placeholder.markdown("".join(chunks))
+    return write
+
 def display_match_score(score):
     """Display the match score with appropriate color and text."""
     if score >= 80:
@@ -45,39 +54,46 @@ def display_recommendations(recommendations):
     else:
         st.markdown("*No specific recommendations available.*")
 
+# Cached grids kept per process; distinct keyword lists from many sessions would otherwise accumulate
+GRID_CACHE_ENTRIES = 256
+
+@st.cache_data(show_spinner=False, max_entries=GRID_CACHE_ENTRIES)
+def _grid_html(items, max_cols, chip_template):
+    """
+    Lays items out as one CSS grid of max_cols columns, rendered by a single markdown call.
+    Items are model output, so they are HTML-escaped before going into the chip template.
+    """
+    cells = "".join(chip_template % html.escape(str(item)) for item in items)
+    return f"<div style='display:grid;grid-template-columns:repeat({max_cols},minmax(0,1fr));'>{cells}</div>"
+
+# Chip templates with the item as their only placeholder
+_KEYWORD_CHIP = ("<div style='background-color:var(--background-color);padding:10px;margin:5px;"
+                 "border:1px solid var(--primary-color);border-radius:20px;text-align:center;font-weight:500;'>%s</div>")
+_TREND_CHIP = ("<div style='background-color:var(--background-color);padding:15px;margin:10px;"
+               "border-left:4px solid var(--primary-color);border-radius:5px;'>📈 %s</div>")
+
 def display_keywords(keywords, max_cols=3):
     """Display keywords in a visually appealing grid."""
     st.subheader("Missing Keywords")
     st.markdown("*These keywords appear in the job description but are missing or underemphasised in your resume:*")
     
     if keywords and isinstance(keywords, list):
-        # Display keywords as a more visually appealing grid
-        keyword_cols = st.columns(max_cols)
-        for i, keyword in enumerate(keywords):
-            col_idx = i % max_cols
-            keyword_cols[col_idx].markdown(
-                f"""<div style='background-color:var(--background-color);padding:10px;margin:5px;
-                border:1px solid var(--primary-color);border-radius:20px;text-align:center;font-weight:500;'>{keyword}</div>""", 
-                unsafe_allow_html=True
-            )
+        # Display keywords as a more visually appealing grid, in one markdown element
+        st.markdown(_grid_html(keywords, max_cols, _KEYWORD_CHIP), unsafe_allow_html=True)
     else:
         st.markdown("*No missing keywords identified.*")
 
 def display_trends(trends, max_cols=2):
     """Display industry trends with a nice UI."""
     if trends:
-        trend_cols = st.columns(max_cols)
-        for i, trend in enumerate(trends):
-            col_idx = i % max_cols
-            trend_cols[col_idx].markdown(
-                f"""<div style='background-color:var(--background-color);padding:15px;margin:10px;
-                border-left:4px solid var(--primary-color);border-radius:5px;'>
-                📈 {trend}</div>""", 
-                unsafe_allow_html=True
-            )
+        st.markdown(_grid_html(trends, max_cols, _TREND_CHIP), unsafe_allow_html=True)
     else:
         st.markdown("*No industry trends identified.*")
 
+def _bullets(items):
+    """Formats items as one markdown bullet list."""
+    return "\n".join(f"- {item}" for item in items)
+
 def display_resume_summary(resume_data):
     """Display a summary of the parsed resume."""
     if resume_data:
@@ -85,15 +101,17 @@ def display_resume_summary(resume_data):
         st.markdown(f"### {resume_data.get('name', 'Candidate')}")
         contact = resume_data.get('contact_info', {})
         if contact:
-            contact_info = []
-            if contact.get('email'):
-                contact_info.append(f"📧 {contact.get('email')}")
-            if contact.get('phone'):
-                contact_info.append(f"📞 {contact.get('phone')}")
-            if contact_info:
-                st.markdown(" | ".join(contact_info))
+            # One lookup per field
+            email = contact.get('email')
+            phone = contact.get('phone')
+            if email and phone:
+                st.markdown(f"📧 {email} | 📞 {phone}")
+            elif email:
+                st.markdown(f"📧 {email}")
+            elif phone:
+                st.markdown(f"📞 {phone}")
         
-        # Skills section
+        # Skills section; each section's items are joined into one markdown element
         st.markdown("#### Skills")
         skills = resume_data.get('skills', {})
         if skills:
@@ -103,8 +121,7 @@ def display_resume_summary(resume_data):
                 st.markdown("**Technical Skills**")
                 tech_skills = skills.get('technical', [])
                 if tech_skills:
-                    for skill in tech_skills:
-                        st.markdown(f"- {skill}")
+                    st.markdown(_bullets(tech_skills))
                 else:
                     st.markdown("*No technical skills listed*")
             
@@ -112,8 +129,7 @@ def display_resume_summary(resume_data):
                 st.markdown("**Soft Skills**")
                 soft_skills = skills.get('soft', [])
                 if soft_skills:
-                    for skill in soft_skills:
-                        st.markdown(f"- {skill}")
+                    st.markdown(_bullets(soft_skills))
                 else:
                     st.markdown("*No soft skills listed*")
         
@@ -121,6 +137,8 @@ def display_resume_summary(resume_data):
         st.markdown("#### Work Experience")
         experience = resume_data.get('work_experience', [])
         if experience:
+            # Blocks are separated by blank lines, so each "---" stays a rule rather than underlining a heading
+            blocks = []
             for job in experience:
                 if isinstance(job, dict):
                     title = job.get('title', 'Position')
@@ -134,12 +152,14 @@ def display_resume_summary(resume_data):
                     if period:
                         job_header += f" | {period}"
                         
-                    st.markdown(job_header)
+                    blocks.append(job_header)
                     if description:
-                        st.markdown(description)
-                    st.markdown("---")
+                        blocks.append(str(description))
+                    blocks.append("---")
                 elif isinstance(job, str):
-                    st.markdown(f"- {job}")
+                    blocks.append(f"- {job}")
+            if blocks:
+                st.markdown("\n\n".join(blocks))
         else:
             st.markdown("*No work experience listed*")
             
@@ -147,29 +167,20 @@ def display_resume_summary(resume_data):
         st.markdown("#### Education")
         education = resume_data.get('education', [])
         if education:
+            lines = []
             for edu in education:
                 if isinstance(edu, dict):
-                    degree = edu.get('degree', '')
-                    institution = edu.get('institution', '')
-                    year = edu.get('year', '')
-                    
-                    edu_text = []
-                    if degree:
-                        edu_text.append(str(degree))
-                    if institution:
-                        edu_text.append(str(institution))
-                    if year:
-                        edu_text.append(str(year))
-                        
+                    edu_text = [str(value) for field in ('degree', 'institution', 'year') if (value := edu.get(field))]
                     if edu_text:
-                        st.markdown(f"- {' | '.join(edu_text)}")
+                        lines.append(f"- {' | '.join(edu_text)}")
                     else:
-                        st.markdown(f"- Education entry (no details available)")
+                        lines.append("- Education entry (no details available)")
                 elif isinstance(edu, str):
-                    st.markdown(f"- {edu}")
+                    lines.append(f"- {edu}")
                 else:
                     # Handle unexpected type
-                    st.markdown(f"- Education entry (format not recognized)")
+                    lines.append("- Education entry (format not recognized)")
+            st.markdown("\n".join(lines))
         else:
             st.markdown("*No education details listed*")
             
@@ -177,7 +188,6 @@ def display_resume_summary(resume_data):
         certifications = resume_data.get('certifications', [])
         if certifications:
             st.markdown("#### Certifications")
-            for cert in certifications:
-                st.markdown(f"- {cert}")
+            st.markdown(_bullets(certifications))
     else:
         st.markdown("*No resume data available*")
@@ -1,9 +1,14 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 
+# Cached charts kept per process; distinct assessments from many sessions would otherwise accumulate
+CHART_CACHE_ENTRIES = 256
+
+@st.cache_data(show_spinner=False, max_entries=CHART_CACHE_ENTRIES)
 def create_skills_chart(skills_assessment):
-    """Create a horizontal bar chart for skills assessment."""
+    """
+    Create a horizontal bar chart for skills assessment.
+    Cached on the assessment's contents, so reruns with the same analysis reuse the chart.
+    """
     if not skills_assessment:
         return None
         
@@ -15,6 +20,10 @@ def create_skills_chart(skills_assessment):
     if not skill_data:
         return None
         
+    # Imported on first use: pandas and altair are slow to load and the login screen never draws this chart
+    import pandas as pd
+    import altair as alt
+    
     skill_df = pd.DataFrame(skill_data)
     
     # Create horizontal bar chart with improved styling
@@ -1,9 +1,24 @@
 # Makes the directory a package
-from utils.error_tracker import error_tracker, ErrorTracker
-from utils.extract_text import extract_text_from_file
-from utils.api_client import call_anthropic_api_with_timeout, initialize_anthropic_client
-from utils.json_parser import extract_json_from_string
+import importlib
 
 # Constants
 CACHE_TTL = 3600  # Cache time-to-live in seconds
 MAX_RETRY_ATTEMPTS = 3
+
+# Re-exported names and their submodules, loaded on first access (PEP 562), so importing one
+# utility (e.g. utils.error_tracker) does not also load PyMuPDF, python-docx and anthropic
+_EXPORTS = {
+    "error_tracker": "utils.error_tracker",
+    "ErrorTracker": "utils.error_tracker",
+    "extract_text_from_file": "utils.extract_text",
+    "call_anthropic_api_with_timeout": "utils.api_client",
+    "initialize_anthropic_client": "utils.api_client",
+    "parse_json_from_string": "utils.json_parser"
+}
+
+__all__ = list(_EXPORTS) + ["CACHE_TTL", "MAX_RETRY_ATTEMPTS"]
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -1,9 +1,22 @@
+import asyncio
 import time
 import traceback
 import streamlit as st
 import anthropic
 from utils.error_tracker import error_tracker
 
+def _message_content(prompt, context=None):
+    """
+    Builds the user message content. A context block goes first and is marked for prompt
+    caching, so calls sharing the same context within five minutes read it at a reduced price.
+    """
+    if context is None:
+        return prompt
+    return [
+        {"type": "text", "text": context, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": prompt}
+    ]
+
 #def call_anthropic_api_with_timeout(client, prompt, model="claude-3-5-sonnet-20240620", 
 #                                   max_tokens=2000, temperature=0.0, system="", 
 #                                   timeout=60, retries=2):
@@ -11,11 +24,14 @@ from utils.error_tracker import error_tracker
 # try the new model: claude-3-7-sonnet-20250219
 def call_anthropic_api_with_timeout(client, prompt, model="claude-3-5-haiku-20241022", 
                                    max_tokens=2000, temperature=0.0, system="", 
-                                   timeout=60, retries=2):
+                                   timeout=60, retries=2, context=None, stream=False, on_text=None):
     """
 
 
     Makes an API call to Anthropic with timeout handling and retries.
+    An optional context is sent ahead of the prompt as a cached content block.
+    With stream=True the response is read incrementally and each text chunk is passed to
+    on_text; if on_text returns True the stream is closed early and the text so far returned.
     """
     start_time = time.time()
     current_attempt = 0
@@ -23,13 +39,46 @@ def call_anthropic_api_with_timeout(client, prompt, model="claude-3-5-haiku-2024
     while current_attempt <= retries:
         current_attempt += 1
         try:
+            if stream:
+                chunks = []
+                try:
+                    with client.messages.stream(
+                        model=model,
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                        system=system,
+                        messages=[{"role": "user", "content": _message_content(prompt, context)}],
+                        timeout=timeout
+                    ) as message_stream:
+                        for text in message_stream.text_stream:
+                            chunks.append(text)
+                            if on_text is not None and on_text(text):
+                                break
+                except anthropic.APITimeoutError:
+                    # Timeouts keep their own retry handling below
+                    raise
+                except anthropic.APIConnectionError:
+                    # A connection dropped before any text arrived is retried while attempts remain;
+                    # once on_text has seen chunks it holds their state, so the stream is not replayed
+                    if not chunks and current_attempt <= retries:
+                        remaining_time = timeout - (time.time() - start_time)
+                        if remaining_time > 0:
+                            time.sleep(min(3, remaining_time))  # Brief pause before retry
+                            continue
+                    raise
+                
+                if chunks:
+                    return True, "".join(chunks)
+                else:
+                    return False, "Empty response received from API"
+            
             # Create a timeout context
             response = client.messages.create(
                 model=model,
                 max_tokens=max_tokens,
                 temperature=temperature,
                 system=system,
-                messages=[{"role": "user", "content": prompt}],
+                messages=[{"role": "user", "content": _message_content(prompt, context)}],
                 timeout=timeout  # Will raise exception if call takes too long
             )
             
@@ -66,16 +115,165 @@ def call_anthropic_api_with_timeout(client, prompt, model="claude-3-5-haiku-2024
     
     return False, "Maximum retries exceeded with no successful response."
 
+async def acall_anthropic_api_with_timeout(client, prompt, model="claude-3-5-haiku-20241022",
+                                          max_tokens=2000, temperature=0.0, system="",
+                                          timeout=60, retries=2, stream=False, on_text=None,
+                                          context=None):
+    """
+    Async counterpart of call_anthropic_api_with_timeout for an anthropic.AsyncAnthropic client.
+    Lets independent calls share one event loop instead of blocking one after another.
+    With stream=True the response is read incrementally and each text chunk is passed to
+    on_text; if on_text returns True the stream is closed early and the text so far returned.
+    """
+    start_time = time.time()
+    current_attempt = 0
+    
+    while current_attempt <= retries:
+        current_attempt += 1
+        try:
+            if stream:
+                chunks = []
+                async with client.messages.stream(
+                    model=model,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    system=system,
+                    messages=[{"role": "user", "content": _message_content(prompt, context)}],
+                    timeout=timeout
+                ) as message_stream:
+                    async for text in message_stream.text_stream:
+                        chunks.append(text)
+                        if on_text is not None and on_text(text):
+                            break
+                
+                if chunks:
+                    return True, "".join(chunks)
+                else:
+                    return False, "Empty response received from API"
+            
+            response = await client.messages.create(
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                system=system,
+                messages=[{"role": "user", "content": _message_content(prompt, context)}],
+                timeout=timeout
+            )
+            
+            if response and hasattr(response, 'content') and len(response.content) > 0:
+                return True, response.content[0].text
+            else:
+                return False, "Empty response received from API"
+                
+        except anthropic.APITimeoutError:
+            if current_attempt <= retries:
+                remaining_time = timeout - (time.time() - start_time)
+                if remaining_time > 0:
+                    st.warning(f"API timeout. Retrying... (Attempt {current_attempt}/{retries})")
+                    await asyncio.sleep(min(3, remaining_time))
+                else:
+                    error_tracker.add_error("api_timeout", f"Timeout after {timeout} seconds. The request took too long to complete.", True)
+                    return False, f"Timeout after {timeout} seconds. The request took too long to complete."
+            else:
+                error_tracker.add_error("api_timeout", f"Request timed out after {timeout} seconds and {retries} retries.", True)
+                return False, f"Request timed out after {timeout} seconds and {retries} retries."
+        except anthropic.APIConnectionError as e:
+            error_tracker.add_error("api_error", "Connection error when calling AI service", True, str(e))
+            return False, f"Connection error: {str(e)}"
+        except anthropic.APIError as e:
+            error_tracker.add_error("api_error", "API error from AI service", True, str(e))
+            return False, f"API error: {str(e)}"
+        except anthropic.RateLimitError as e:
+            error_tracker.add_error("api_error", "Rate limit exceeded when calling AI service", True, str(e))
+            return False, f"Rate limit exceeded: {str(e)}"
+        except Exception as e:
+            error_msg = f"Unexpected error: {str(e)}"
+            error_tracker.add_error("api_error", "Unexpected error when calling AI service", True, traceback.format_exc())
+            return False, error_msg
+    
+    return False, "Maximum retries exceeded with no successful response."
+
+# Message Batches settings: polling starts short and backs off up to the ceiling
+BATCH_MODEL = "claude-3-5-haiku-20241022"
+BATCH_POLL_INITIAL = 5
+BATCH_POLL_MAX = 120
+BATCH_MAX_WAIT = 24 * 3600  # Batches expire after 24 hours
+
+def submit_message_batch(client, requests, model=BATCH_MODEL):
+    """
+    Submits several requests as one Message Batch, processed asynchronously at a reduced price.
+    requests maps custom ids (letters, digits, "_" or "-") to dicts holding prompt, max_tokens,
+    temperature, system and optionally context, as returned by the analyzers' build_*_request helpers.
+    Returns the batch id, or None if the batch could not be created.
+    """
+    try:
+        batch = client.messages.batches.create(requests=[
+            {
+                "custom_id": custom_id,
+                "params": {
+                    "model": model,
+                    "max_tokens": request["max_tokens"],
+                    "temperature": request["temperature"],
+                    "system": request["system"],
+                    "messages": [{"role": "user", "content": _message_content(request["prompt"], request.get("context"))}]
+                }
+            }
+            for custom_id, request in requests.items()
+        ])
+        return batch.id
+    except anthropic.APIError as e:
+        error_tracker.add_error("api_error", "Could not submit the message batch", True, str(e))
+        return None
+
+def wait_for_message_batch(client, batch_id, max_wait=BATCH_MAX_WAIT):
+    """
+    Polls a Message Batch with exponential backoff until it has ended.
+    Returns True once it has ended, False if max_wait elapses first or the status cannot be read.
+    """
+    start_time = time.time()
+    delay = BATCH_POLL_INITIAL
+    try:
+        while client.messages.batches.retrieve(batch_id).processing_status != "ended":
+            remaining_time = max_wait - (time.time() - start_time)
+            if remaining_time <= 0:
+                return False
+            time.sleep(min(delay, remaining_time))
+            delay = min(delay * 2, BATCH_POLL_MAX)
+        return True
+    except anthropic.APIError as e:
+        error_tracker.add_error("api_error", "Could not check the message batch status", False, str(e))
+        return False
+
+def collect_message_batch(client, batch_id, max_wait=BATCH_MAX_WAIT):
+    """
+    Waits for a Message Batch to end, then reads its results.
+    Returns a dict mapping each custom id to a (success, response_text) tuple, mirroring
+    call_anthropic_api_with_timeout; ids missing from the results are reported as failures.
+    """
+    if not wait_for_message_batch(client, batch_id, max_wait):
+        error_tracker.add_error("api_timeout", f"Message batch {batch_id} did not finish within {max_wait} seconds.", True)
+        return {}
+
+    try:
+        results = {}
+        for entry in client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded" and entry.result.message.content:
+                results[entry.custom_id] = (True, entry.result.message.content[0].text)
+            else:
+                results[entry.custom_id] = (False, f"Batch request {entry.result.type}")
+        return results
+    except anthropic.APIError as e:
+        error_tracker.add_error("api_error", "Could not read the message batch results", True, str(e))
+        return {}
+
+@st.cache_resource(show_spinner=False)
 def initialize_anthropic_client():
-    """Initialize the Anthropic client with proper error handling."""
+    """
+    Initialize the Anthropic client with proper error handling.
+    Cached once per process, so reruns and sessions share one client and its pooled connections.
+    """
     try:
-        # Use anthropic.Anthropic for newer versions
-        client = anthropic.Anthropic(api_key=st.secrets["ANTHROPIC_API_KEY"])
-        return client
-    except AttributeError:
-        # Fallback for older versions if needed
-        client = anthropic.Client(api_key=st.secrets["ANTHROPIC_API_KEY"])
-        return client
+        return anthropic.Anthropic(api_key=st.secrets["ANTHROPIC_API_KEY"])
     except KeyError:
         st.error("ANTHROPIC_API_KEY not found in Streamlit secrets. Please add it to your .streamlit/secrets.toml file.")
         st.info("To learn how to set up Streamlit secrets, visit: https://docs.streamlit.io/library/advanced-features/secrets-management")
@@ -1,3 +1,4 @@
+import time
 import streamlit as st
 from datetime import datetime
 
@@ -18,9 +19,9 @@ class ErrorTracker:
     
     def add_error(self, error_type, message, critical=False, details=None):
         """Add an error to the tracking system"""
-        timestamp = datetime.now().isoformat()
+        # Stored as epoch nanoseconds; format_timestamp turns it into text only when shown
         error = {
-            "timestamp": timestamp,
+            "timestamp": time.time_ns(),
             "type": error_type,
             "message": message,
             "critical": critical,
@@ -35,6 +36,11 @@ class ErrorTracker:
             if details:
                 print(f"Details: {details}")
     
+    @staticmethod
+    def format_timestamp(error):
+        """ISO 8601 local time at which an error was recorded"""
+        return datetime.fromtimestamp(error["timestamp"] / 1e9).isoformat()
+    
     def get_user_message(self, error_type):
         """Get a user-friendly error message"""
         return ERROR_MESSAGES.get(error_type, "An unexpected error occurred. Please try again.")
@@ -45,13 +51,15 @@ class ErrorTracker:
             return
         
         with st.expander("Troubleshooting Information", expanded=self.has_critical_error):
-            for error in self.errors:
+            for index, error in enumerate(self.errors):
                 if error["critical"]:
                     st.error(f"{error['message']}")
                 else:
                     st.warning(f"{error['message']}")
                 
-                if error.get("details") and st.checkbox("Show technical details"):
+                # Each checkbox needs its own key, or a second error with details raises DuplicateWidgetID
+                if error.get("details") and st.checkbox("Show technical details", key=f"error_details_{index}"):
+                    st.caption(f"Recorded at {self.format_timestamp(error)}")
                     st.code(error["details"])
             
             if self.has_critical_error:
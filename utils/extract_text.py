@@ -1,62 +1,82 @@
+import codecs
+import hashlib
 import io
-from PyPDF2 import PdfReader
-import docx
+import streamlit as st
 from utils.error_tracker import error_tracker
 
-def extract_text_from_pdf(file):
-    """Extract text from a PDF file."""
-    try:
-        reader = PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                 text += page_text + "\n"
-        return text
-    except Exception as e:
-        error_tracker.add_error("parse_error", f"Error reading PDF {file.name}", True, str(e))
-        return ""
+def extract_text_from_pdf(file_content):
+    """Extract text from PDF bytes with PyMuPDF, parsed in memory. Raises if the PDF cannot be read."""
+    # Imported on first use, so starting the app does not load the PDF library
+    import pymupdf
+    
+    with pymupdf.open(stream=file_content, filetype="pdf") as doc:
+        # One join over the page texts; no intermediate page + newline strings
+        return "\n".join([page.get_text("text") for page in doc]) + "\n"
 
-def extract_text_from_docx(file):
-    """Extract text from a DOCX file."""
-    try:
-        doc = docx.Document(file)
-        text = ""
-        for para in doc.paragraphs:
-            text += para.text + "\n"
-        return text
-    except Exception as e:
-        error_tracker.add_error("parse_error", f"Error reading DOCX {file.name}", True, str(e))
-        return ""
+def extract_text_from_docx(file_content):
+    """Extract text from DOCX bytes, parsed in memory. Raises if the document cannot be read."""
+    # Imported on first use, like PyMuPDF above
+    import docx
+    
+    doc = docx.Document(io.BytesIO(file_content))
+    return "\n".join([para.text for para in doc.paragraphs]) + "\n"
+
+# Parsed texts kept per process, keyed by a fingerprint of the file's bytes
+EXTRACT_CACHE_TTL = 3600  # One hour in seconds
+EXTRACT_CACHE_ENTRIES = 32
 
 def extract_text_from_file(file):
-    """Extract text from a supported file format (PDF, DOCX, TXT)."""
+    """
+    Extract text from a supported file format (PDF, DOCX, TXT).
+    Uploads are already in memory, so every format is parsed from the bytes without temp files,
+    and identical bytes are only parsed once: reruns, previews and re-uploads reuse the text.
+    """
     file_name = file.name.lower()
-    # Read content once
+    if not file_name.endswith(('.pdf', '.docx', '.txt')):
+        error_tracker.add_error("parse_error", f"Unsupported file type: {file_name}", False)
+        return None
+    
+    # Take the whole buffer at once; unlike read(), this leaves the file pointer where it was
     try:
-        file_content = file.read()
-        # Reset file pointer AFTER reading
-        file.seek(0)
+        file_content = file.getvalue()
     except Exception as e:
         error_tracker.add_error("parse_error", f"Error reading file {file.name}", True, str(e))
         return None
 
-    if file_name.endswith('.pdf'):
-        return extract_text_from_pdf(file)
-    elif file_name.endswith('.docx'):
-        # Use BytesIO for docx
-        return extract_text_from_docx(io.BytesIO(file_content))
-    elif file_name.endswith('.txt'):
-        # Decode bytes to string with error handling
+    # The 16-byte BLAKE2b fingerprint is the cache key; the bytes themselves are not hashed again
+    fingerprint = hashlib.blake2b(file_content, digest_size=16).hexdigest()
+    try:
+        return _extract_text_cached(fingerprint, file.name, file_content)
+    except Exception as e:
+        # Raised inside the cached function, so a failed parse is never cached and can be retried
+        file_type = "PDF" if file_name.endswith('.pdf') else "DOCX"
+        error_tracker.add_error("parse_error", f"Error reading {file_type} {file.name}", True, str(e))
+        return ""
+
+@st.cache_data(ttl=EXTRACT_CACHE_TTL, max_entries=EXTRACT_CACHE_ENTRIES, show_spinner=False)
+def _extract_text_cached(fingerprint, file_name, _file_content):
+    """Parses file bytes by extension; cached on the fingerprint and name. Parse errors propagate uncached."""
+    lower_name = file_name.lower()
+    if lower_name.endswith('.pdf'):
+        return extract_text_from_pdf(_file_content)
+    elif lower_name.endswith('.docx'):
+        return extract_text_from_docx(_file_content)
+    else:
+        return decode_text(_file_content)
+
+def decode_text(file_content):
+    """
+    Decodes a plain-text upload. A byte order mark decides the encoding when present;
+    otherwise UTF-8 is tried, then Windows-1252 (smart quotes and dashes from Windows editors),
+    with latin-1, which decodes any bytes, as the last resort.
+    """
+    if file_content.startswith(codecs.BOM_UTF8):
+        return file_content.decode('utf-8-sig', errors='replace')
+    if file_content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return file_content.decode('utf-16', errors='replace')
+    for encoding in ('utf-8', 'cp1252'):
         try:
-            return file_content.decode('utf-8')
+            return file_content.decode(encoding)
         except UnicodeDecodeError:
-            try:
-                # Try another common encoding
-                return file_content.decode('latin-1')
-            except Exception as e:
-                error_tracker.add_error("parse_error", f"Error decoding text file {file.name}", True, str(e))
-                return None
-    else:
-        error_tracker.add_error("parse_error", f"Unsupported file type: {file_name}", False)
-        return None
+            pass
+    return file_content.decode('latin-1')
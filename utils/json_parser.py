@@ -1,76 +1,133 @@
+import ast
 import json
 import re
+import orjson
 import streamlit as st
 from utils.error_tracker import error_tracker
 
-def extract_json_from_string(text, default_structure=None):
+# Fenced-block pattern and decoder for parse_json_from_string, created once
+_FENCE_RE = re.compile(r'```(?:json)?\s*(\{.*\}|\[.*\])\s*```', re.DOTALL | re.IGNORECASE)
+_DECODER = json.JSONDecoder()
+# Returned by _decode_json when nothing decodes, since JSON null is a valid result
+_NOT_FOUND = object()
+
+def to_prompt_json(obj):
     """
-    Extracts JSON object from a string with multiple fallback strategies.
-    Returns extracted JSON string or default_structure if all extraction methods fail.
+    Serialises data as compact JSON for embedding in a prompt; indentation only adds
+    request bytes and input tokens, and the model reads compact JSON just as well.
+    Never raises for analyzer inputs: non-string keys are stringified and unsupported
+    values such as dates fall back to str(), so callers need no try/except around it.
     """
-    if not text:
-        error_tracker.add_error("parse_error", "Empty response received from API.", True)
-        return default_structure
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+def build_validator(schema, name="validate"):
+    """
+    Compiles a validator specialised to a schema of {field: (default, expected_type)}.
+    The generated function is straight-line code: each field is filled with a fresh copy
+    of its default when missing (expected_type None) or when its value has the wrong type.
+    """
+    lines = [f"def {name}(data):"]
+    for field, (default, expected_type) in schema.items():
+        # Defaults are emitted as literals, so they must round-trip through repr
+        if ast.literal_eval(repr(default)) != default:
+            raise ValueError(f"Default for {field!r} cannot be written as a literal")
+        if expected_type is None:
+            lines.append(f"    if {field!r} not in data:")
+        else:
+            lines.append(f"    if not isinstance(data.get({field!r}), {expected_type.__name__}):")
+        lines.append(f"        data[{field!r}] = {default!r}")
+    lines.append("    return data")
+    
+    namespace = {}
+    exec(compile("\n".join(lines), f"<validator {name}>", "exec"), namespace)
+    return namespace[name]
+
+class JsonObjectScanner:
+    """Tracks brace depth over streamed text to detect when the first JSON object is complete."""
+    
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, chunk):
+        """Consume a chunk of text; returns True once the outermost object has closed"""
+        for char in chunk:
+            if self.in_string:
+                # Braces inside JSON strings do not count towards the depth
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = self.started
+            elif char == '{':
+                self.depth += 1
+                self.started = True
+            elif char == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+def _decode_json(text):
+    """Returns the first JSON object or array found in text, or _NOT_FOUND."""
+    # Fast path: the prompts ask for JSON only, so most replies are one JSON document,
+    # which orjson parses faster than the stdlib. It has no prefix decoding, so it only
+    # handles replies with nothing around the JSON
+    stripped = text.strip()
+    if stripped[:1] in ('{', '['):
+        try:
+            return orjson.loads(stripped)
+        except orjson.JSONDecodeError:
+            pass
     
     # Strategy 1: Look for JSON within ```json ... ``` markdown fences
-    json_pattern = r'```(?:json)?\s*(\{.*\}|\[.*\])\s*```'
-    match = re.search(json_pattern, text, re.DOTALL | re.IGNORECASE)
+    match = _FENCE_RE.search(text)
     if match:
-        potential_json = match.group(1).strip()
         try:
-            # Validate by parsing and re-stringifying to ensure valid JSON
-            parsed = json.loads(potential_json)
-            return json.dumps(parsed)  # Return validated and normalized JSON string
+            # Decode in place rather than copying the fenced block out first
+            return _DECODER.raw_decode(text, match.start(1))[0]
         except json.JSONDecodeError:
             # If parsing fails, continue to next strategy
             pass
     
-    # Strategy 2: Find outermost matching braces/brackets - more careful approach
-    # First check if entire text is valid JSON
-    try:
-        parsed = json.loads(text.strip())
-        return json.dumps(parsed)  # Return validated JSON
-    except json.JSONDecodeError:
-        pass
-        
-    # Strategy 3: Find the first occurrence of what looks like a JSON object/array
-    # This is riskier, so we do it later
-    bracket_pattern = r'(\{.*\}|\[.*\])'
-    match = re.search(bracket_pattern, text, re.DOTALL)
-    if match:
-        potential_json = match.group(0).strip()
+    # Strategy 2: Decode from the first opening brace or bracket. raw_decode parses in C and
+    # stops where the value ends, so surrounding prose needs no regex to strip it
+    for start in sorted(position for position in (text.find('{'), text.find('[')) if position >= 0):
         try:
-            parsed = json.loads(potential_json)
-            return json.dumps(parsed)  # Return validated JSON
+            return _DECODER.raw_decode(text, start)[0]
         except json.JSONDecodeError:
             pass
     
-    # Strategy 4: As a last resort, try to clean up the text by removing common issues
-    cleaned_text = text.strip()
-    # Try to find the first { or [ and the last } or ]
-    start_brace = cleaned_text.find('{')
-    start_bracket = cleaned_text.find('[')
-    end_brace = cleaned_text.rfind('}')
-    end_bracket = cleaned_text.rfind(']')
+    return _NOT_FOUND
+
+def parse_json_from_string(text, fallback_json=None):
+    """
+    Extracts and parses the JSON object or array in a model response.
+    Returns the parsed value, or a fresh copy of fallback_json (None if not given) when no
+    valid JSON is found, so callers get data directly instead of re-parsing a JSON string.
+    """
+    if not text:
+        error_tracker.add_error("parse_error", "Empty response received from API.", True)
+        return None if fallback_json is None else orjson.loads(fallback_json)
     
-    # Determine which kind of structure we're dealing with (if any)
-    if start_brace >= 0 and end_brace >= 0 and (start_bracket < 0 or start_brace < start_bracket):
-        potential_json = cleaned_text[start_brace:end_brace+1]
-    elif start_bracket >= 0 and end_bracket >= 0:
-        potential_json = cleaned_text[start_bracket:end_bracket+1]
+    # Without a brace or bracket there is nothing to decode; the membership tests are C-level
+    # scans, so whitespace-only or prose replies skip the fence regex and the decode attempts
+    if '{' not in text and '[' not in text:
+        error_tracker.add_error("json_error", "No JSON delimiters found in the response.", True)
     else:
-        # No valid JSON structure found
-        error_tracker.add_error("json_error", "Could not find a valid JSON structure in the response.", True)
-        if default_structure is not None:
-            st.info("Using fallback structure instead.")
-        return default_structure
-    
-    try:
-        parsed = json.loads(potential_json)
-        return json.dumps(parsed)  # Return validated JSON
-    except json.JSONDecodeError:
+        parsed = _decode_json(text)
+        if parsed is not _NOT_FOUND:
+            return parsed
+        
         # All strategies failed
-        error_tracker.add_error("json_error", "All JSON extraction strategies failed. The response is not valid JSON.", True)
-        if default_structure is not None:
-            st.info("Using fallback structure instead.")
-        return default_structure
+        error_tracker.add_error("json_error", "Could not find valid JSON in the response.", True)
+    
+    if fallback_json is None:
+        return None
+    st.info("Using fallback structure instead.")
+    return orjson.loads(fallback_json)
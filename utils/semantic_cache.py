@@ -0,0 +1,189 @@
+import functools
+import hashlib
+import inspect
+import os
+import re
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+import numpy as np
+import orjson
+import streamlit as st
+from utils.error_tracker import error_tracker
+
+# --- Cache Settings ---
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".careervertex")
+EMBEDDING_DIM = 2048
+DEFAULT_THRESHOLD = 0.93
+DEFAULT_TTL = 7 * 24 * 3600  # Seven days in seconds
+
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+def _canonicalize(value):
+    """Converts an analyzer input into lower-cased, whitespace-normalised text."""
+    if not isinstance(value, str):
+        value = orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+    return " ".join(value.lower().split())
+
+def _embed(text):
+    """
+    Embeds text as an L2-normalised hashed bag of word unigrams and bigrams.
+    Stable across processes (crc32 rather than hash()) so vectors can be persisted.
+    """
+    words = _WORD_RE.findall(text)
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for token in words + [a + " " + b for a, b in zip(words, words[1:])]:
+        vector[zlib.crc32(token.encode()) % EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _lexical_guard(inputs):
+    """
+    Exact-match guard built from the first line of each text input (job title) and a digest of
+    each structured input (the parsed resume and analysis). Near-identical documents for a
+    different role, and any other candidate's resume, must never share a cached answer.
+    """
+    parts = []
+    for value in inputs:
+        if isinstance(value, str):
+            first_line = value.strip().partition("\n")[0]
+            parts.append(" ".join(sorted(set(_WORD_RE.findall(first_line.lower())))))
+        else:
+            parts.append(hashlib.blake2b(_canonicalize(value).encode(), digest_size=16).hexdigest())
+    return "|".join(parts)
+
+class SemanticCache:
+    """SQLite-backed store of analyzer responses looked up by embedding similarity."""
+
+    def __init__(self, path):
+        self.path = path
+        self._initialized = False
+
+    def _connect(self):
+        """Open a connection, creating the cache table on first use"""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        if not self._initialized:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "task TEXT, guard TEXT, created_at REAL, embedding BLOB, response TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lookup ON responses (task, guard)")
+            self._initialized = True
+        return conn
+
+    def lookup(self, task, guard, embedding, threshold, ttl):
+        """Return the cached response most similar to the embedding, or None below threshold"""
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT embedding, response FROM responses WHERE task = ? AND guard = ? AND created_at >= ?",
+                    (task, guard, time.time() - ttl)
+                ).fetchall()
+        except sqlite3.Error as e:
+            error_tracker.add_error("cache_error", "Could not read the analysis cache", False, str(e))
+            return None
+
+        if not rows:
+            return None
+
+        matrix = np.frombuffer(b"".join(row[0] for row in rows), dtype=np.float32).reshape(len(rows), EMBEDDING_DIM)
+        scores = matrix @ embedding
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        return orjson.loads(rows[best][1])
+
+    def store(self, task, guard, embedding, response, ttl):
+        """Persist a response alongside its embedding, deleting the task's expired responses"""
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM responses WHERE task = ? AND created_at < ?", (task, now - ttl))
+                conn.execute(
+                    "INSERT INTO responses (task, guard, created_at, embedding, response) VALUES (?, ?, ?, ?, ?)",
+                    (task, guard, now, embedding.tobytes(), orjson.dumps(response).decode())
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            error_tracker.add_error("cache_error", "Could not write to the analysis cache", False, str(e))
+
+@functools.lru_cache(maxsize=None)
+def _user_cache(user):
+    """Per-user cache file; the login name is hashed so it does not appear on disk."""
+    return SemanticCache(os.path.join(CACHE_DIR, f"semantic-cache-{hashlib.sha256(user.encode()).hexdigest()[:16]}.sqlite3"))
+
+def _current_cache():
+    """The signed-in user's cache, or None outside a signed-in session, which then runs uncached."""
+    user = st.session_state.get('authenticated_user')
+    return _user_cache(user) if user else None
+
+def _critical_error_count():
+    """Number of critical errors tracked so far, used to avoid caching failed calls"""
+    return sum(1 for error in error_tracker.errors if error["critical"])
+
+def _is_fallback(value):
+    """Fallback results carry an *_error key or an "Unable to ..." placeholder, at any depth."""
+    if isinstance(value, str):
+        return value.startswith("Unable to")
+    if isinstance(value, dict):
+        return any(key.endswith("_error") or _is_fallback(item) for key, item in value.items())
+    if isinstance(value, list):
+        return any(_is_fallback(item) for item in value)
+    return False
+
+def is_cacheable(result):
+    """Fallback and missing results must not be reused."""
+    return result is not None and not _is_fallback(result)
+
+def semantic_cache(task, threshold=DEFAULT_THRESHOLD, ttl=DEFAULT_TTL):
+    """
+    Decorates an analyzer taking (client, *inputs) so that near-identical inputs reuse a prior response.
+    Responses are only shared within the signed-in user's own cache, and expire after ttl seconds.
+    The key is an embedding of the canonicalised positional inputs, not of the full prompt template;
+    the client and keyword arguments (pre-serialised copies of the inputs) are never part of the key.
+    Works for both plain and async analyzers.
+    """
+    def decorator(func):
+        def prepare(args, kwargs):
+            inputs = args[1:]
+            embedding = _embed(" ".join(_canonicalize(value) for value in inputs))
+            return _lexical_guard(inputs), embedding
+
+        def remember(cache, guard, embedding, result, errors_before):
+            if is_cacheable(result) and _critical_error_count() == errors_before:
+                cache.store(task, guard, embedding, result, ttl)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache = _current_cache()
+                if cache is None:
+                    return await func(*args, **kwargs)
+                guard, embedding = prepare(args, kwargs)
+                cached = cache.lookup(task, guard, embedding, threshold, ttl)
+                if cached is not None:
+                    return cached
+                errors_before = _critical_error_count()
+                result = await func(*args, **kwargs)
+                remember(cache, guard, embedding, result, errors_before)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = _current_cache()
+            if cache is None:
+                return func(*args, **kwargs)
+            guard, embedding = prepare(args, kwargs)
+            cached = cache.lookup(task, guard, embedding, threshold, ttl)
+            if cached is not None:
+                return cached
+            errors_before = _critical_error_count()
+            result = func(*args, **kwargs)
+            remember(cache, guard, embedding, result, errors_before)
+            return result
+        return wrapper
+
+    return decorator